@@ -0,0 +1,117 @@
+"""
+API key lookup caching for the XSS Scanner API
+"""
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import config
+
+# Returned by APIKeyCache.get when a key has no live entry
+MISSING = object()
+
+class APIKeyCache:
+    """
+    Thread-safe LRU cache of API key lookups.
+
+    Active keys are cached with their key document for ttl seconds. Keys that
+    were not found are cached as None for negative_ttl seconds, so repeated
+    attempts with an invalid key do not reach the database. Entries are stored
+    under a hash of the key rather than the key itself.
+    """
+
+    def __init__(
+        self,
+        ttl: float = config.API_KEY_CACHE_TTL,
+        negative_ttl: float = config.API_KEY_NEGATIVE_CACHE_TTL,
+        max_entries: int = config.API_KEY_CACHE_MAX_ENTRIES
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _hash_key(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode("utf-8", "surrogatepass")).hexdigest()
+
+    def get(self, api_key: str) -> Any:
+        """
+        Returns the cached lookup for an API key.
+
+        Args:
+            api_key: The API key
+
+        Returns:
+            The key document, None for a cached invalid key, or MISSING
+        """
+        hashed_key = self._hash_key(api_key)
+        with self._lock:
+            entry = self._entries.get(hashed_key)
+            if entry is not None:
+                expires_at, key_document = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(hashed_key)
+                    if key_document is None:
+                        self.negative_hits += 1
+                    else:
+                        self.hits += 1
+                    return key_document
+                del self._entries[hashed_key]
+            self.misses += 1
+            return MISSING
+
+    def set(self, api_key: str, key_document: Optional[Dict[str, Any]]) -> None:
+        """
+        Caches a lookup result.
+
+        Args:
+            api_key: The API key
+            key_document: The key document, or None if the key is invalid
+        """
+        if self.max_entries <= 0:
+            return
+        ttl = self.ttl if key_document is not None else self.negative_ttl
+        hashed_key = self._hash_key(api_key)
+        with self._lock:
+            self._entries[hashed_key] = (time.monotonic() + ttl, key_document)
+            self._entries.move_to_end(hashed_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, api_key: str) -> None:
+        """Drops the entry of a key, e.g. after it is revoked or created"""
+        with self._lock:
+            self._entries.pop(self._hash_key(api_key), None)
+
+    def invalidate_user(self, user_id: str) -> None:
+        """Drops the entries of every cached key belonging to a user"""
+        with self._lock:
+            for hashed_key, (_, key_document) in list(self._entries.items()):
+                if key_document is not None and key_document.get("user_id") == user_id:
+                    del self._entries[hashed_key]
+
+    def clear(self) -> None:
+        """Drops every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit and miss counters and the current size"""
+        lookups = self.hits + self.negative_hits + self.misses
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.negative_hits) / lookups if lookups else 0.0,
+            "size": len(self._entries)
+        }
+
+# Global API key cache instance
+api_key_cache = APIKeyCache()
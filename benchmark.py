@@ -0,0 +1,368 @@
+"""
+Benchmark suite for XSSScanner.scan_code
+
+Usage:
+    python -m benchmark [--size BYTES] [--count N] [--repeat N] [--output FILE] [--compare FILE]
+
+Generates a seeded synthetic corpus with one input class per kind of code the
+scanner struggles with, scans it and reports throughput in MB/s, p50/p99
+latency per input and peak memory for each class. The same seed and options
+always produce the same corpus, so results stored with --output can be
+compared across runs and engine changes with --compare.
+"""
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, List, Optional
+
+from config import config
+from utils import XSSScanner
+
+RESULTS_VERSION = 1
+
+IDENTIFIERS = ["user", "data", "item", "node", "el", "config", "result", "value", "query", "html", "state", "props"]
+
+# Lines that trigger rules, and near misses that only pass the literal prefilter
+SINKS = [
+    'document.getElementById("{name}").innerHTML = {name};',
+    "{name}.innerHTML = '<b>' + userInput + '</b>';",
+    "{name}.outerHTML = {name}Html;",
+    'document.write("<p>" + {name} + "</p>");',
+    "document.writeln({name});",
+    "eval({name}Code);",
+    "var {name}Hash = location.hash.slice(1);",
+    '<button onclick="handle{name}()">Go</button>',
+    '<a href="javascript:show{name}()">Show</a>',
+    "{name}.src = 'https://cdn.example.com/{name}.js';",
+    "{name}.href = \"/{name}/view\";",
+    "const {name}Row = `<td>${{{name}.label}}</td>`;",
+    "{name}.insertAdjacentHTML('beforeend', {name}Html);",
+    "{name}.setAttribute('onclick', {name}Handler);",
+    "const {name}Script = document.createElement('script');",
+]
+NEAR_MISSES = [
+    "{name}.textContent = {name}Value;",
+    "const {name}Evaluation = evaluate({name});",
+    "log('innerHTML was not touched for {name}');",
+    "{name}.dataset.href = {name}Link;",
+    "if (location.pathname === '/{name}') {{ render({name}); }}",
+    "const {name}Writer = createWriter({name});",
+]
+PLAIN = [
+    "const {name} = require('./{name}');",
+    "function update{name}({name}, options) {{",
+    "  return {name}.map((entry) => entry.id);",
+    "}}",
+    "let {name}Count = {number};",
+    "if ({name} && {name}.length > {number}) {{ {name}.pop(); }}",
+    "export default {{ {name}, {name}Count }};",
+]
+
+def _line(rng: random.Random, templates: List[str]) -> str:
+    return rng.choice(templates).format(name=rng.choice(IDENTIFIERS), number=rng.randint(0, 9999))
+
+def _fill(rng: random.Random, size: int, next_line: Callable[[random.Random], str], separator: str = "\n") -> str:
+    """Joins generated lines until the document reaches size characters"""
+    parts = []
+    length = 0
+    while length < size:
+        line = next_line(rng)
+        parts.append(line)
+        length += len(line) + len(separator)
+    return separator.join(parts)[:size]
+
+def generate_minified(rng: random.Random, size: int) -> str:
+    """Minified JS bundle: a few lines of tens of kilobytes, statements joined by semicolons"""
+    def statement(rng: random.Random) -> str:
+        roll = rng.random()
+        if roll < 0.03:
+            return _line(rng, SINKS).rstrip(";")
+        if roll < 0.10:
+            return _line(rng, NEAR_MISSES).rstrip(";")
+        return f'var {rng.choice("abcdefghijklmnopqrstuvwxyz")}{rng.randint(0, 99)}="{rng.choice(IDENTIFIERS)}://x/{rng.randint(0, 999)}"'
+
+    lines = []
+    length = 0
+    while length < size:
+        line = _fill(rng, rng.randint(20000, 60000), statement, ";")
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)[:size]
+
+def generate_template_html(rng: random.Random, size: int) -> str:
+    """Server-side template: nested markup, template tags, inline handlers and script blocks"""
+    def block(rng: random.Random) -> str:
+        name = rng.choice(IDENTIFIERS)
+        roll = rng.random()
+        if roll < 0.15:
+            body = "\n".join(_line(rng, SINKS + PLAIN + PLAIN) for _ in range(rng.randint(2, 8)))
+            return f"<script>\n{body}\n</script>"
+        if roll < 0.30:
+            return f'<div class="{name}" onclick="toggle(\'{name}\')">{{{{ {name}.title }}}}</div>'
+        if roll < 0.45:
+            return f"{{% for {name} in {name}s %}}\n  <li data-id=\"{{{{ {name}.id }}}}\">{{{{ {name}.label | escape }}}}</li>\n{{% endfor %}}"
+        if roll < 0.55:
+            return f'<a href="{{{{ url_for(\'{name}\') }}}}" title="${{{name}}}">{name}</a>'
+        return f'<section id="{name}-{rng.randint(0, 999)}">\n  <p class="muted">{name} {rng.randint(0, 999)}</p>\n</section>'
+
+    return _fill(rng, size, block)
+
+def generate_comment_dense(rng: random.Random, size: int) -> str:
+    """Mostly comments, many of them mentioning sinks, with comment markers inside strings"""
+    def line(rng: random.Random) -> str:
+        roll = rng.random()
+        if roll < 0.35:
+            return "// " + _line(rng, SINKS)
+        if roll < 0.50:
+            return "/* " + _line(rng, SINKS) + "\n * " + _line(rng, NEAR_MISSES) + "\n */"
+        if roll < 0.60:
+            return "<!-- " + _line(rng, SINKS) + " -->"
+        if roll < 0.70:
+            return f'var url = "http://example.com/{rng.randint(0, 999)}"; ' + _line(rng, SINKS)
+        if roll < 0.80:
+            return "/** " + _line(rng, SINKS) + " */"
+        return _line(rng, PLAIN + NEAR_MISSES)
+
+    return _fill(rng, size, line)
+
+def generate_pathological(rng: random.Random, size: int) -> str:
+    """Long lines that make backtracking engines retry from every position"""
+    def line(rng: random.Random) -> str:
+        length = rng.randint(1000, 3000)
+        roll = rng.random()
+        if roll < 0.3:
+            # Template literal rule: many "${" openings that never close
+            return "`" + ("${a" * length)[:length]
+        if roll < 0.6:
+            # innerHTML with user input: "+" everywhere, userInput nowhere
+            return "el.innerHTML = " + ("a+" * length)[:length]
+        if roll < 0.8:
+            # Event handler rule: "on" word starts without a quoted value
+            return ("onx= " * length)[:length]
+        return "<script" + " " * length
+
+    return _fill(rng, size, line)
+
+def generate_finding_dense(rng: random.Random, size: int) -> str:
+    """A finding on nearly every line"""
+    return _fill(rng, size, lambda rng: _line(rng, SINKS))
+
+CORPUS_CLASSES: Dict[str, Callable[[random.Random, int], str]] = {
+    "minified": generate_minified,
+    "template_html": generate_template_html,
+    "comment_dense": generate_comment_dense,
+    "pathological": generate_pathological,
+    "finding_dense": generate_finding_dense,
+}
+
+def generate_corpus(seed: int = 0, size: int = 100000, count: int = 10, classes: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Generates the benchmark corpus.
+
+    Args:
+        seed: Seed of the corpus; the same seed always yields the same documents
+        size: Characters per document
+        count: Documents per class
+        classes: Input classes to generate, defaults to all of CORPUS_CLASSES
+
+    Returns:
+        Dictionary mapping class names to their documents
+    """
+    corpus = {}
+    for name in classes or CORPUS_CLASSES:
+        generator = CORPUS_CLASSES[name]
+        corpus[name] = [generator(random.Random(f"{seed}:{name}:{index}"), size) for index in range(count)]
+    return corpus
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+def run_benchmark(
+    corpus: Dict[str, List[str]],
+    scanner_instance: XSSScanner,
+    repeat: int = 3,
+    measure_memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Scans every document of the corpus repeat times, without the result cache.
+
+    Timings come from runs without tracemalloc; peak memory is measured in one
+    extra traced run per document, since tracing slows scanning down.
+
+    Args:
+        corpus: Documents by class, from generate_corpus
+        scanner_instance: Scanner to benchmark
+        repeat: Timed scans per document
+        measure_memory: Whether to measure peak memory per class
+
+    Returns:
+        Statistics by class and for the whole corpus
+    """
+    classes = {}
+    total_bytes = 0
+    total_seconds = 0.0
+    all_latencies = []
+    for name, documents in corpus.items():
+        latencies = []
+        findings = 0
+        partial = 0
+        class_bytes = sum(len(document.encode("utf-8")) for document in documents)
+        for document in documents:
+            for _ in range(repeat):
+                started = time.perf_counter()
+                result = scanner_instance.scan_code(document, use_cache=False)
+                latencies.append(time.perf_counter() - started)
+            findings += result["vulnerabilities_found"]
+            partial += bool(result["partial"])
+
+        peak_memory = None
+        if measure_memory:
+            tracemalloc.start()
+            peak_memory = 0
+            for document in documents:
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                scanner_instance.scan_code(document, use_cache=False)
+                peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1] - baseline)
+            tracemalloc.stop()
+
+        seconds = sum(latencies)
+        classes[name] = {
+            "documents": len(documents),
+            "bytes": class_bytes,
+            "mb_per_s": class_bytes * repeat / seconds / 1e6 if seconds else None,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "mean_ms": seconds / len(latencies) * 1000,
+            "findings": findings,
+            "partial": partial,
+            "peak_memory_bytes": peak_memory,
+        }
+        total_bytes += class_bytes * repeat
+        total_seconds += seconds
+        all_latencies.extend(latencies)
+
+    return {
+        "classes": classes,
+        "total": {
+            "bytes": total_bytes,
+            "mb_per_s": total_bytes / total_seconds / 1e6 if total_seconds else None,
+            "p50_ms": percentile(all_latencies, 0.50) * 1000 if all_latencies else None,
+            "p99_ms": percentile(all_latencies, 0.99) * 1000 if all_latencies else None,
+        }
+    }
+
+def _max_rss_bytes() -> Optional[int]:
+    """Peak resident set size of this process, where the platform reports it"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+def format_results(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    """Formats results as a table, with the throughput change against a baseline run"""
+    header = f"{'class':<15} {'MB/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'findings':>9} {'partial':>8} {'peak MB':>8}"
+    if baseline is not None:
+        header += f" {'vs base':>8}"
+    lines = [header]
+    rows = list(results["classes"].items()) + [("total", results["total"])]
+    for name, stats in rows:
+        peak = stats.get("peak_memory_bytes")
+        line = (
+            f"{name:<15} {stats['mb_per_s'] or 0:>8.2f} {stats['p50_ms'] or 0:>9.2f} {stats['p99_ms'] or 0:>9.2f} "
+            f"{stats.get('findings', ''):>9} {stats.get('partial', ''):>8} "
+            f"{'' if peak is None else f'{peak / 1e6:.1f}':>8}"
+        )
+        if baseline is not None:
+            base_stats = baseline["classes"].get(name) if name != "total" else baseline.get("total")
+            if base_stats and base_stats.get("mb_per_s") and stats["mb_per_s"]:
+                line += f" {(stats['mb_per_s'] / base_stats['mb_per_s'] - 1) * 100:>+7.1f}%"
+        lines.append(line)
+    return "\n".join(lines) + "\n"
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmark XSSScanner.scan_code.")
+    parser.add_argument("--seed", type=int, default=0, help="corpus seed (default: %(default)s)")
+    parser.add_argument("--size", type=int, default=100000, help="characters per document (default: %(default)s)")
+    parser.add_argument("--count", type=int, default=10, help="documents per class (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed scans per document (default: %(default)s)")
+    parser.add_argument(
+        "--classes", default=",".join(CORPUS_CLASSES),
+        help="comma-separated input classes (default: %(default)s)"
+    )
+    parser.add_argument("--regex-backend", default=config.REGEX_BACKEND, help="re or re2 (default: %(default)s)")
+    parser.add_argument(
+        "--time-budget", type=float, default=10.0,
+        help="seconds a scan may take, 0 for no limit (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--max-vulnerabilities", type=int, default=config.SCAN_JOB_MAX_VULNERABILITIES,
+        help="findings per scan at most (default: %(default)s)"
+    )
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurement")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare throughput with")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s: %(message)s")
+    args = parse_args(argv)
+    classes = [name.strip() for name in args.classes.split(",") if name.strip()]
+    unknown_classes = [name for name in classes if name not in CORPUS_CLASSES]
+    if unknown_classes:
+        sys.stderr.write(f"error: unknown classes {', '.join(unknown_classes)}; choose from {', '.join(CORPUS_CLASSES)}\n")
+        return 2
+
+    scanner_instance = XSSScanner(regex_backend=args.regex_backend)
+    scanner_instance.max_code_length = max(args.size, 1)
+    scanner_instance.max_vulnerabilities = args.max_vulnerabilities
+    scanner_instance.time_budget = args.time_budget
+
+    corpus = generate_corpus(args.seed, args.size, args.count, classes)
+    results = run_benchmark(corpus, scanner_instance, args.repeat, not args.no_memory)
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "regex_backend": scanner_instance.regex_backend.name,
+        "ruleset_version": scanner_instance.ruleset_version,
+        "options": {
+            "seed": args.seed,
+            "size": args.size,
+            "count": args.count,
+            "repeat": args.repeat,
+            "time_budget": args.time_budget,
+            "max_vulnerabilities": args.max_vulnerabilities,
+        },
+        **results,
+        "max_rss_bytes": _max_rss_bytes(),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("options") != results["options"]:
+            sys.stderr.write("warning: the baseline was run with different options\n")
+
+    sys.stdout.write(format_results(results, baseline))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2)
+            output_file.write("\n")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,6 +11,12 @@ class Config:
     # Database
     MONGODB_URI: Optional[str] = os.getenv("MONGODB_URI")
     DATABASE_NAME: str = os.getenv("DATABASE_NAME", "devtools_conglomerate")
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "20"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+    MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000"))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000"))
 
     # Stripe
     STRIPE_API_KEY: Optional[str] = os.getenv("STRIPE_API_KEY")
@@ -23,21 +29,106 @@ class Config:
     # Security - Generate secure random key if not provided
     SECRET_KEY: str = os.getenv("SECRET_KEY") or secrets.token_hex(32)
 
+    # Admin endpoints (/admin/...) require this key in the X-Admin-Key header;
+    # they are disabled when it is not set
+    ADMIN_API_KEY: Optional[str] = os.getenv("ADMIN_API_KEY")
+
+    # Prometheus metrics at /metrics (per server process)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
     # CORS
     ALLOWED_ORIGINS: list = os.getenv("ALLOWED_ORIGINS", "http://localhost:3000,http://localhost:8000").split(",")
 
+    # API key lookup cache: valid keys for API_KEY_CACHE_TTL seconds, unknown
+    # keys for API_KEY_NEGATIVE_CACHE_TTL seconds (0 entries disables it)
+    API_KEY_CACHE_TTL: float = float(os.getenv("API_KEY_CACHE_TTL", "60"))
+    API_KEY_NEGATIVE_CACHE_TTL: float = float(os.getenv("API_KEY_NEGATIVE_CACHE_TTL", "30"))
+    API_KEY_CACHE_MAX_ENTRIES: int = int(os.getenv("API_KEY_CACHE_MAX_ENTRIES", "10000"))
+
+    # Seconds between writes of accumulated API key usage to MongoDB
+    USAGE_FLUSH_INTERVAL: float = float(os.getenv("USAGE_FLUSH_INTERVAL", "10"))
+
     # Rate limiting
+    # Token bucket per API key: refills RATE_LIMIT_PER_MINUTE tokens a minute and
+    # holds up to RATE_LIMIT_BURST; a request costs one token plus one per
+    # RATE_LIMIT_BYTES_PER_TOKEN bytes of code (0 per minute disables the limit)
     RATE_LIMIT_PER_MINUTE: int = int(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", os.getenv("RATE_LIMIT_PER_MINUTE", "60")))
+    RATE_LIMIT_BYTES_PER_TOKEN: int = int(os.getenv("RATE_LIMIT_BYTES_PER_TOKEN", "50000"))
 
     # Scanner settings
     MAX_CODE_LENGTH: int = int(os.getenv("MAX_CODE_LENGTH", "100000"))
     MAX_VULNERABILITIES: int = int(os.getenv("MAX_VULNERABILITIES", "50"))
 
+    # Regex engine for scan rules: "re" (standard library) or "re2" (linear time,
+    # requires the google-re2 package, startup fails without it; rules it cannot
+    # express still use re)
+    REGEX_BACKEND: str = os.getenv("REGEX_BACKEND", "re")
+
+    # Wall-clock seconds a single scan may take before it returns partial results
+    # (0 disables the limit)
+    SCAN_TIME_BUDGET: float = float(os.getenv("SCAN_TIME_BUDGET", "2.0"))
+
+    # The budget is only checked between regex searches. On the re engine, rules
+    # whose search time grows faster than the line length skip lines longer than
+    # this many characters, which bounds a single search to well under a tenth of
+    # a second; they find nothing on longer (e.g. minified) lines. Rules compiled
+    # with re2 are linear and scan every line (0 disables the limit)
+    SCAN_MAX_LINE_LENGTH: int = int(os.getenv("SCAN_MAX_LINE_LENGTH", "2000"))
+
+    # Record per-rule timings and match counts from startup; can also be switched
+    # at runtime through /admin/rule-stats
+    SCAN_INSTRUMENTATION: bool = os.getenv("SCAN_INSTRUMENTATION", "false").lower() == "true"
+
+    # Scan executor: inputs of at least SCAN_PROCESS_THRESHOLD characters run on the
+    # process pool, smaller ones on the thread pool (0 processes disables the pool)
+    SCAN_THREAD_WORKERS: int = int(os.getenv("SCAN_THREAD_WORKERS", "4"))
+    SCAN_PROCESS_WORKERS: int = int(os.getenv("SCAN_PROCESS_WORKERS", "2"))
+    SCAN_PROCESS_THRESHOLD: int = int(os.getenv("SCAN_PROCESS_THRESHOLD", "20000"))
+
+    # Chunked scanning: documents of at least SCAN_PARALLEL_THRESHOLD characters are
+    # split at line breaks into chunks of about SCAN_CHUNK_SIZE characters that are
+    # scanned on a process pool (SCAN_CHUNK_WORKERS processes in scan jobs, the
+    # scan executor's process pool in the API). The threshold has to stay below the
+    # scanner's 50000 character limit for /scan and /scan/batch to use chunks.
+    SCAN_PARALLEL_THRESHOLD: int = int(os.getenv("SCAN_PARALLEL_THRESHOLD", "40000"))
+    SCAN_CHUNK_SIZE: int = int(os.getenv("SCAN_CHUNK_SIZE", "20000"))
+    SCAN_CHUNK_WORKERS: int = int(os.getenv("SCAN_CHUNK_WORKERS", str(os.cpu_count() or 1)))
+
+    # In-memory scan result cache (0 entries disables it)
+    SCAN_CACHE_MAX_ENTRIES: int = int(os.getenv("SCAN_CACHE_MAX_ENTRIES", "10000"))
+    SCAN_CACHE_TTL: float = float(os.getenv("SCAN_CACHE_TTL", "3600"))
+
+    # Optional Redis tier of the scan result cache, shared by all workers
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+    SCAN_CACHE_REDIS_TTL: float = float(os.getenv("SCAN_CACHE_REDIS_TTL", "86400"))
+
+    # Background scan jobs (Celery). The memory broker and result backend only
+    # work with a worker in the same process; use Redis URLs in production.
+    # Without a broker, jobs are refused unless CELERY_TASK_ALWAYS_EAGER runs
+    # them inside the API request that queues them (for tests and development)
+    CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", "memory://")
+    CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", "cache+memory://")
+    CELERY_TASK_ALWAYS_EAGER: bool = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
+    SCAN_JOB_RESULT_EXPIRES: int = int(os.getenv("SCAN_JOB_RESULT_EXPIRES", "3600"))
+    SCAN_JOB_MAX_CODE_LENGTH: int = int(os.getenv("SCAN_JOB_MAX_CODE_LENGTH", "10000000"))
+    SCAN_JOB_MAX_VULNERABILITIES: int = int(os.getenv("SCAN_JOB_MAX_VULNERABILITIES", "1000"))
+    SCAN_JOB_TIME_BUDGET: float = float(os.getenv("SCAN_JOB_TIME_BUDGET", "300"))
+
+    # Batch scan limits per request
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "2000"))
+    BATCH_MAX_BYTES: int = int(os.getenv("BATCH_MAX_BYTES", "10000000"))
+
     @property
     def is_database_enabled(self) -> bool:
         """Check if database is configured"""
         return self.MONGODB_URI is not None
 
+    @property
+    def is_redis_enabled(self) -> bool:
+        """Check if Redis is configured"""
+        return self.REDIS_URL is not None
+
     @property
     def is_stripe_enabled(self) -> bool:
         """Check if Stripe is configured"""
@@ -0,0 +1,75 @@
+"""
+Async database access for the XSS Scanner API
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, Any, List, Optional
+
+from pymongo import MongoClient
+
+from config import config
+
+class APIKeyRepository:
+    """Async access to the api_keys collection"""
+
+    def __init__(self, database: "Database"):
+        self.database = database
+        self.collection = database.db.api_keys
+
+    async def find_active(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Looks up an active API key.
+
+        Args:
+            key: The API key
+
+        Returns:
+            The key document, or None if the key is unknown or inactive
+        """
+        return await self.database.run(self.collection.find_one, {"key": key, "is_active": True})
+
+    async def bulk_update(self, operations: List[Any]) -> None:
+        """
+        Applies update operations in one unordered bulk_write.
+
+        Args:
+            operations: pymongo write operations such as UpdateOne
+        """
+        if operations:
+            await self.database.run(self.collection.bulk_write, operations, ordered=False)
+
+class Database:
+    """
+    MongoDB connection whose queries never block the event loop.
+
+    pymongo calls run on a thread pool sized to the connection pool, so a slow
+    primary only holds up the requests waiting on the database. Pool size,
+    timeouts and server selection settings come from Config.
+    """
+
+    def __init__(self, uri: str, database_name: str = config.DATABASE_NAME):
+        self.client = MongoClient(
+            uri,
+            maxPoolSize=config.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=config.MONGODB_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=config.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=config.MONGODB_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=config.MONGODB_SOCKET_TIMEOUT_MS,
+            waitQueueTimeoutMS=config.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+        )
+        self.db = self.client.get_database(database_name)
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.MONGODB_MAX_POOL_SIZE, thread_name_prefix="mongodb"
+        )
+        self.api_keys = APIKeyRepository(self)
+
+    async def run(self, function, *args, **kwargs) -> Any:
+        """Runs a blocking pymongo call on the database thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(function, *args, **kwargs))
+
+    def close(self) -> None:
+        """Closes the connection pool and its threads"""
+        self._executor.shutdown(wait=True)
+        self.client.close()
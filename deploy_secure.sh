@@ -306,11 +306,24 @@ services:
       - STRIPE_API_KEY=\${STRIPE_API_KEY}
       - STRIPE_WEBHOOK_SECRET=\${STRIPE_WEBHOOK_SECRET}
       - ALLOWED_ORIGINS=\${ALLOWED_ORIGINS}
+      - REDIS_URL=redis://redis:6379/0
+      - CELERY_BROKER_URL=redis://redis:6379/1
+      - CELERY_RESULT_BACKEND=redis://redis:6379/2
     depends_on:
       - mongodb
       - redis
     restart: unless-stopped
 
+  scan-worker:
+    build: .
+    command: celery -A tasks worker --loglevel=info
+    environment:
+      - CELERY_BROKER_URL=redis://redis:6379/1
+      - CELERY_RESULT_BACKEND=redis://redis:6379/2
+    depends_on:
+      - redis
+    restart: unless-stopped
+
   mongodb:
     image: mongo:6.0
     environment:
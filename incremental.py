@@ -0,0 +1,158 @@
+"""
+Incremental scanning of the files changed by a git diff
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import subprocess
+from bisect import bisect_left
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HUNK_HEADER_PATTERN = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+def _diff_path(header: str) -> Optional[str]:
+    """Path from a ---/+++ header line, without its a/ or b/ prefix; None for /dev/null"""
+    path = header[4:].split("\t")[0].rstrip("\r\n")
+    if path.startswith('"') and path.endswith('"'):
+        # git quotes unusual paths C-style, with non-ASCII bytes as octal escapes
+        escaped_bytes = path[1:-1].encode("ascii", "backslashreplace")
+        path = escaped_bytes.decode("unicode_escape").encode("latin-1").decode("utf-8", "replace")
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+def parse_unified_diff(diff: str) -> Dict[str, List[int]]:
+    """
+    Finds the lines a unified diff adds or changes, by path in the new tree.
+
+    Deleted files and hunks that only remove lines touch nothing in the new tree.
+
+    Args:
+        diff: Unified diff, as produced by git diff or diff -u
+
+    Returns:
+        Dictionary mapping paths to their ascending touched line numbers
+    """
+    touched_lines: Dict[str, List[int]] = {}
+    path = None
+    line_number = 0
+    remaining = 0
+    for line in diff.splitlines():
+        if remaining <= 0:
+            if line.startswith("+++ "):
+                path = _diff_path(line)
+                if path is not None:
+                    touched_lines.setdefault(path, [])
+                continue
+            hunk = HUNK_HEADER_PATTERN.match(line)
+            if hunk is not None:
+                line_number = int(hunk.group(1))
+                remaining = int(hunk.group(2) or 1)
+            continue
+
+        if line.startswith("+"):
+            if path is not None:
+                touched_lines[path].append(line_number)
+            line_number += 1
+            remaining -= 1
+        elif line.startswith(" ") or line == "":
+            line_number += 1
+            remaining -= 1
+    return touched_lines
+
+def git_diff(base: str, cwd: Optional[str] = None) -> str:
+    """
+    Returns the diff between a revision and the working tree, with paths relative to cwd.
+
+    Args:
+        base: Revision to compare with, such as origin/main
+        cwd: Directory inside the repository, defaults to the working directory
+
+    Raises:
+        RuntimeError: If git fails, e.g. outside a repository or for an unknown revision
+    """
+    command = ["git", "diff", "--unified=0", "--no-color", "--no-ext-diff", "--relative", base, "--"]
+    try:
+        completed = subprocess.run(command, cwd=cwd, capture_output=True, check=True)
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", b"") or b""
+        raise RuntimeError(f"git diff {base} failed: {stderr.decode('utf-8', 'replace').strip() or e}")
+    return completed.stdout.decode("utf-8", "replace")
+
+def filter_findings(result: Dict[str, Any], touched_lines: List[int], context_lines: int = 0) -> Dict[str, Any]:
+    """
+    Keeps the findings of a scan result that lie on touched lines.
+
+    Args:
+        result: Scan result, as returned by XSSScanner.scan_code
+        touched_lines: Ascending line numbers the change touched
+        context_lines: Also keep findings this many lines around a touched line
+
+    Returns:
+        Copy of the result with only those findings
+    """
+    def is_touched(line_number: int) -> bool:
+        position = bisect_left(touched_lines, line_number - context_lines)
+        return position < len(touched_lines) and touched_lines[position] <= line_number + context_lines
+
+    vulnerabilities = [
+        vulnerability for vulnerability in result.get("vulnerabilities", [])
+        if is_touched(vulnerability["line"])
+    ]
+    filtered_result = {**result, "vulnerabilities_found": len(vulnerabilities), "vulnerabilities": vulnerabilities}
+    if not result.get("partial"):
+        filtered_result["message"] = f"Scan completed. Found {len(vulnerabilities)} potential vulnerabilities on changed lines."
+    return filtered_result
+
+def git_blob_hash(data: bytes) -> str:
+    """Returns the object id git gives a file with this content (as git hash-object does)"""
+    blob = hashlib.sha1(b"blob %d\0" % len(data))
+    blob.update(data)
+    return blob.hexdigest()
+
+class BlobResultCache:
+    """
+    Scan results stored on disk under the git blob hash of the scanned file.
+
+    A file that has not changed since an earlier run, on any branch, is not
+    scanned again. Entries are kept per scanner configuration (ruleset version
+    and limits) and written atomically, so concurrent workers may share a
+    directory. Partial results are not cached.
+    """
+
+    def __init__(self, directory: str, scanner_key: str):
+        self.directory = os.path.join(directory, scanner_key)
+
+    def _path(self, blob_hash: str) -> str:
+        return os.path.join(self.directory, blob_hash[:2], f"{blob_hash[2:]}.json")
+
+    def get(self, blob_hash: str) -> Optional[Dict[str, Any]]:
+        """Returns the cached result for a blob, or None"""
+        try:
+            with open(self._path(blob_hash), encoding="utf-8") as entry:
+                return json.load(entry)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry for {blob_hash}: {e}")
+            return None
+
+    def set(self, blob_hash: str, result: Dict[str, Any]) -> None:
+        """Stores a complete scan result for a blob"""
+        if result.get("partial"):
+            return
+        path = self._path(blob_hash)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temporary_path, "w", encoding="utf-8") as entry:
+                json.dump(result, entry, separators=(",", ":"))
+            os.replace(temporary_path, path)
+        except OSError as e:
+            logger.warning(f"Cannot write cache entry for {blob_hash}: {e}")
@@ -6,20 +6,40 @@ It's designed to be secure, scalable, and maintainable with proper error handlin
 """
 
 import logging
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pymongo import MongoClient
 from contextlib import asynccontextmanager
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+import time
+import json
+import math
+import uuid
+import secrets
+import redis.asyncio as redis
 import stripe
 import os
 from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from celery.result import AsyncResult
 
+import metrics
 from config import config
-from models import XSSScanRequest, ScanResponse, HealthResponse
+from models import (
+    XSSScanRequest, ScanResponse, ScanTimings, HealthResponse, Vulnerability,
+    BatchScanItem, BatchScanRequest, BatchScanItemResponse, BatchScanResponse, DiffScanRequest,
+    ScanJobRequest, ScanJobResponse, RuleStatsResponse, RuleStatsUpdate
+)
+from api_key_cache import api_key_cache, MISSING
+from database import Database
+from usage import usage_accumulator
+from tasks import celery_app, scan_job, can_queue_jobs, shutdown_chunk_pool
+from rate_limit import rate_limiter, RedisRateLimiter, request_cost, hash_api_key
+from scan_cache import RedisScanCache
+from scan_executor import scan_executor
 from utils import scanner
+from incremental import parse_unified_diff, filter_findings
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,8 +51,8 @@ async def lifespan(app: FastAPI):
     Manage database connection lifecycle.
     """
     if config.is_database_enabled:
-        app.mongodb_client = MongoClient(config.MONGODB_URI)
-        app.database = app.mongodb_client.get_database(config.DATABASE_NAME)
+        app.database = Database(config.MONGODB_URI, config.DATABASE_NAME)
+        usage_accumulator.start(app.database.api_keys)
         logger.info("Connected to MongoDB")
     else:
         logger.warning("MongoDB URI not configured; database features disabled")
@@ -41,10 +61,27 @@ async def lifespan(app: FastAPI):
         stripe.api_key = config.STRIPE_API_KEY
         logger.info("Stripe API key configured")
 
+    if config.is_redis_enabled:
+        app.redis = redis.Redis.from_url(config.REDIS_URL)
+        scan_executor.shared_cache = RedisScanCache(app.redis)
+        app.rate_limiter = RedisRateLimiter(app.redis)
+        logger.info("Redis scan cache and rate limiter configured")
+
+    scan_executor.start()
+
     yield
 
-    if hasattr(app, "mongodb_client"):
-        app.mongodb_client.close()
+    scan_executor.shutdown()
+    # Eager jobs scan large inputs on a chunk pool in this process
+    shutdown_chunk_pool()
+
+    if hasattr(app, "redis"):
+        scan_executor.shared_cache = None
+        await app.redis.aclose()
+
+    if hasattr(app, "database"):
+        await usage_accumulator.stop()
+        app.database.close()
         logger.info("Disconnected from MongoDB")
 
 app = FastAPI(
@@ -61,12 +98,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/", StaticFiles(directory=".", html=True), name="static")
-
-async def get_api_key(x_api_key: str = Header(None)) -> Dict[str, Any]:
+if config.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+@metrics.registry.collector
+def collect_service_metrics() -> None:
+    """Copies cache counters and worker pool backlogs into the metrics"""
+    if scanner.result_cache is not None:
+        metrics.record_cache_stats("scan", scanner.result_cache.stats())
+    if scan_executor.shared_cache is not None:
+        metrics.record_cache_stats("scan_redis", scan_executor.shared_cache.stats())
+    metrics.record_cache_stats("api_key", api_key_cache.stats())
+    for pool in ("thread", "process"):
+        metrics.EXECUTOR_TASKS.labels(pool).set(scan_executor.tasks[pool])
+        metrics.EXECUTOR_QUEUE_DEPTH.labels(pool).set(scan_executor.queue_depth(pool))
+
+async def get_api_key(request: Request, x_api_key: str = Header(None)) -> Dict[str, Any]:
     """
     Validate API key from header with proper security checks.
+
+    Lookups are cached for a short time, including keys that were not found;
+    call api_key_cache.invalidate() when a key is revoked. The lookup time and
+    when it finished are kept in request.state for the scan timings.
     """
     if not x_api_key:
         raise HTTPException(status_code=401, detail="API key required in X-API-Key header")
@@ -76,17 +129,41 @@ async def get_api_key(x_api_key: str = Header(None)) -> Dict[str, Any]:
         logger.error("Database not available for API key validation")
         raise HTTPException(status_code=500, detail="Service temporarily unavailable")
 
-    try:
-        key_document = app.database.api_keys.find_one({"key": x_api_key, "is_active": True})
+    started = time.perf_counter()
+    key_document = api_key_cache.get(x_api_key)
+    if key_document is MISSING:
+        try:
+            key_document = await app.database.api_keys.find_active(x_api_key)
+        except Exception as e:
+            logger.error(f"Database error during API key validation: {e}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+        api_key_cache.set(x_api_key, key_document)
+        source = "database"
+    else:
+        source = "cache"
+    request.state.auth_finished = time.perf_counter()
+    request.state.auth_time = request.state.auth_finished - started
+    metrics.API_KEY_LOOKUP_LATENCY.labels(source).observe(request.state.auth_time)
 
-        if not key_document:
-            logger.warning(f"Invalid API key attempted: {x_api_key[:8]}...")
-            raise HTTPException(status_code=401, detail="Invalid or inactive API key")
+    if not key_document:
+        logger.warning(f"Invalid API key attempted: {x_api_key[:8]}...")
+        raise HTTPException(status_code=401, detail="Invalid or inactive API key")
 
-        return key_document
-    except Exception as e:
-        logger.error(f"Database error during API key validation: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    return key_document
+
+async def enforce_rate_limit(api_key_info: Dict[str, Any], bytes_scanned: int) -> None:
+    """
+    Charge a request to its API key's token bucket, weighted by the bytes it scans.
+    """
+    limiter = getattr(app, "rate_limiter", rate_limiter)
+    decision = await limiter.acquire(api_key_info["key"], request_cost(bytes_scanned))
+    if not decision.allowed:
+        logger.warning(f"Rate limit exceeded by user: {api_key_info.get('user_id', 'unknown')}")
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(decision.retry_after)))}
+        )
 
 @app.get("/", response_model=HealthResponse)
 async def root():
@@ -133,30 +210,67 @@ async def stripe_webhook(request: Request) -> JSONResponse:
         logger.error(f"Webhook processing error: {e}")
         raise HTTPException(status_code=500, detail="Webhook processing failed")
 
+def render_scan_response(result: Dict[str, Any], timings: Dict[str, float]) -> Response:
+    """
+    Builds and encodes a /scan response with its timings, serialization included.
+
+    The response is encoded without its timings and they are appended to the
+    JSON object afterwards, so serialization times the encoding actually sent.
+    """
+    started = time.perf_counter()
+    body = ScanResponse(**result).model_dump_json(exclude={"timings"})
+    timings["serialization"] = time.perf_counter() - started
+    return Response(
+        content=f'{body[:-1]},"timings":{ScanTimings(**timings).model_dump_json()}}}',
+        media_type="application/json"
+    )
+
 @app.post("/scan", response_model=ScanResponse, summary="Scan code for XSS vulnerabilities")
 async def scan_for_xss(
     request: XSSScanRequest,
-    api_key_info: Dict[str, Any] = Depends(get_api_key)
+    http_request: Request,
+    api_key_info: Dict[str, Any] = Depends(get_api_key),
+    timings: bool = Query(False, description="Add the time spent in each phase of the request")
 ):
     """
     Scan code for XSS vulnerabilities with comprehensive validation and error handling.
+
+    With ?timings=true the response breaks the server's time down by phase:
+    request validation, API key lookup, queue wait, the scanner's prefilter,
+    regex matching and comment filtering, and response serialization.
     """
     try:
-        # Additional validation beyond Pydantic
+        # XSSScanRequest has rejected blank code; the configured size limit may be lower than its own
         if len(request.code) > config.MAX_CODE_LENGTH:
             raise HTTPException(
                 status_code=413,
                 detail=f"Code too large. Maximum size: {config.MAX_CODE_LENGTH} characters"
             )
-
-        if not request.code.strip():
-            raise HTTPException(status_code=400, detail="Code cannot be empty")
+        validated = time.perf_counter()
 
         # Log scan attempt (without exposing sensitive data)
         logger.info(f"Scan initiated by user: {api_key_info.get('user_id', 'unknown')}")
 
-        result = scanner.scan_code(request.code)
-        return ScanResponse(**result)
+        code_bytes = len(request.code.encode("utf-8", "surrogatepass"))
+        await enforce_rate_limit(api_key_info, code_bytes)
+        usage_accumulator.record(api_key_info["key"], code_bytes)
+        metrics.BYTES_SCANNED.inc(code_bytes)
+
+        # Scan on a worker pool so the event loop keeps serving other requests
+        result, queue_wait, scan_time = await scan_executor.scan(request.code, timings=timings)
+        logger.info(f"Scan finished in {scan_time:.3f}s after waiting {queue_wait:.3f}s for a worker")
+        result = {**result, "scan_duration": scan_time, "queue_wait": queue_wait, "code_length": len(request.code)}
+        if not timings:
+            return ScanResponse(**result)
+
+        # FastAPI validates the body after the API key dependency, then the handler checks it again
+        phase_timings = result.pop("timings", None) or {}
+        phase_timings.update(
+            validation=validated - http_request.state.auth_finished,
+            auth=http_request.state.auth_time,
+            queue_wait=queue_wait
+        )
+        return render_scan_response(result, phase_timings)
 
     except ValidationError as e:
         logger.warning(f"Validation error: {e}")
@@ -169,3 +283,284 @@ async def scan_for_xss(
     except Exception as e:
         logger.error(f"Scan error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during scanning")
+
+@app.post("/scan/stream", summary="Stream scan findings as NDJSON")
+async def scan_stream(
+    request: XSSScanRequest,
+    api_key_info: Dict[str, Any] = Depends(get_api_key)
+) -> StreamingResponse:
+    """
+    Scan code and stream each vulnerability as an NDJSON line as soon as it is found.
+
+    Every line is a JSON object with a "type" field: "vulnerability" records carry
+    the fields of a /scan vulnerability, and a final "summary" record carries the
+    remaining /scan response fields. A failure after streaming has started ends
+    the stream with an "error" record instead of the summary.
+    """
+    if len(request.code) > config.MAX_CODE_LENGTH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Code too large. Maximum size: {config.MAX_CODE_LENGTH} characters"
+        )
+
+    code_bytes = len(request.code.encode("utf-8", "surrogatepass"))
+    await enforce_rate_limit(api_key_info, code_bytes)
+
+    logger.info(f"Streaming scan initiated by user: {api_key_info.get('user_id', 'unknown')}")
+    usage_accumulator.record(api_key_info["key"], code_bytes)
+    metrics.BYTES_SCANNED.inc(code_bytes)
+
+    async def ndjson_records():
+        summary = {}
+        started = time.perf_counter()
+        try:
+            async for finding in scan_executor.iter_scan(request.code, summary=summary):
+                yield json.dumps({"type": "vulnerability", **Vulnerability(**finding).model_dump()}) + "\n"
+        except Exception as e:
+            logger.error(f"Streaming scan error: {e}")
+            yield json.dumps({"type": "error", "message": "Internal server error during scanning"}) + "\n"
+            return
+
+        summary.update(scan_duration=time.perf_counter() - started, code_length=len(request.code))
+        yield json.dumps({"type": "summary", **summary}) + "\n"
+
+    return StreamingResponse(ndjson_records(), media_type="application/x-ndjson")
+
+async def scan_items(
+    items: List[BatchScanItem],
+    api_key_info: Dict[str, Any],
+    touched_lines: Optional[Dict[str, List[int]]] = None,
+    context_lines: int = 0
+) -> BatchScanResponse:
+    """
+    Checks the batch limits and rate limit, then scans named snippets in parallel.
+
+    Args:
+        items: The snippets to scan
+        api_key_info: Key document of the caller
+        touched_lines: When set, only findings on these lines of each snippet,
+            by name, are reported
+        context_lines: Also report findings this many lines from a touched line
+    """
+    if len(items) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many items. Maximum per batch: {config.BATCH_MAX_ITEMS}"
+        )
+
+    total_bytes = sum(len(item.code.encode("utf-8", "surrogatepass")) for item in items)
+    if total_bytes > config.BATCH_MAX_BYTES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large. Maximum size: {config.BATCH_MAX_BYTES} bytes"
+        )
+
+    for item in items:
+        if len(item.code) > config.MAX_CODE_LENGTH:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Item '{item.name}' too large. Maximum size: {config.MAX_CODE_LENGTH} characters"
+            )
+
+    await enforce_rate_limit(api_key_info, total_bytes)
+
+    logger.info(f"Batch scan of {len(items)} items initiated by user: {api_key_info.get('user_id', 'unknown')}")
+    usage_accumulator.record(api_key_info["key"], total_bytes, scans=len(items))
+    metrics.BYTES_SCANNED.inc(total_bytes)
+
+    started = time.perf_counter()
+    scan_results = await scan_executor.scan_many([item.code for item in items])
+
+    results = []
+    for item, (result, queue_wait, scan_time) in zip(items, scan_results):
+        if isinstance(result, Exception):
+            logger.error(f"Scan error in batch item: {result}")
+            result = {
+                "status": "error",
+                "vulnerabilities_found": 0,
+                "vulnerabilities": [],
+                "message": "Internal server error during scanning"
+            }
+        elif touched_lines is not None:
+            result = filter_findings(result, touched_lines[item.name], context_lines)
+        results.append(BatchScanItemResponse(**{
+            **result, "name": item.name, "scan_duration": scan_time, "queue_wait": queue_wait,
+            "code_length": len(item.code)
+        }))
+
+    return BatchScanResponse(
+        status="success",
+        items_scanned=len(results),
+        vulnerabilities_found=sum(result.vulnerabilities_found for result in results),
+        results=results,
+        scan_duration=time.perf_counter() - started
+    )
+
+@app.post("/scan/batch", response_model=BatchScanResponse, summary="Scan many named snippets in one request")
+async def scan_batch(
+    request: BatchScanRequest,
+    api_key_info: Dict[str, Any] = Depends(get_api_key)
+):
+    """
+    Scan a batch of snippets with a single authentication, in parallel across the worker pools.
+    """
+    try:
+        return await scan_items(request.items, api_key_info)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error(f"Batch scan error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error during scanning")
+
+@app.post("/scan/diff", response_model=BatchScanResponse, summary="Scan the lines a diff changes")
+async def scan_diff(
+    request: DiffScanRequest,
+    api_key_info: Dict[str, Any] = Depends(get_api_key)
+):
+    """
+    Incremental scan for pull request checks.
+
+    Only the files that are both in the diff and in the request are scanned,
+    whole so that comments and multi-line rules are seen in context, and only
+    findings on lines the diff adds or changes are reported. Unchanged file
+    contents are served from the scan cache.
+    """
+    try:
+        touched_lines = {
+            path: lines for path, lines in parse_unified_diff(request.diff).items() if lines
+        }
+        items = [item for item in request.files if item.name in touched_lines]
+        if not items:
+            return BatchScanResponse(status="success", items_scanned=0, vulnerabilities_found=0, results=[])
+        return await scan_items(items, api_key_info, touched_lines, request.context_lines)
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error(f"Diff scan error: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error during scanning")
+
+def scan_job_prefix(api_key_info: Dict[str, Any]) -> str:
+    """
+    Job id prefix derived from the API key, so a job can only be read with the key that created it.
+    """
+    return hash_api_key(api_key_info["key"])[:16] + "-"
+
+@app.post("/scan/jobs", response_model=ScanJobResponse, status_code=202, summary="Start a background scan job")
+async def create_scan_job(
+    request: ScanJobRequest,
+    api_key_info: Dict[str, Any] = Depends(get_api_key)
+):
+    """
+    Queue a scan on the job workers and return its id right away; poll GET /scan/jobs/{job_id} for the result.
+    """
+    if len(request.code) > config.SCAN_JOB_MAX_CODE_LENGTH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Code too large. Maximum size: {config.SCAN_JOB_MAX_CODE_LENGTH} characters"
+        )
+
+    if not can_queue_jobs():
+        raise HTTPException(status_code=503, detail="Scan jobs are not available: no job broker is configured")
+
+    code_bytes = len(request.code.encode("utf-8", "surrogatepass"))
+    await enforce_rate_limit(api_key_info, code_bytes)
+
+    job_id = scan_job_prefix(api_key_info) + uuid.uuid4().hex
+    try:
+        await run_in_threadpool(scan_job.apply_async, args=[request.code], task_id=job_id)
+    except Exception as e:
+        logger.error(f"Failed to queue scan job: {e}")
+        raise HTTPException(status_code=503, detail="Scan job queue temporarily unavailable")
+
+    usage_accumulator.record(api_key_info["key"], code_bytes)
+    metrics.BYTES_SCANNED.inc(code_bytes)
+    logger.info(f"Scan job {job_id} queued by user: {api_key_info.get('user_id', 'unknown')}")
+    return ScanJobResponse(job_id=job_id, status="pending", progress=0.0)
+
+@app.get("/scan/jobs/{job_id}", response_model=ScanJobResponse, summary="Get the status of a background scan job")
+async def get_scan_job(
+    job_id: str,
+    api_key_info: Dict[str, Any] = Depends(get_api_key)
+):
+    """
+    Report a scan job's status, its progress while running and its result once completed.
+
+    Unknown and expired jobs both read as pending, as the result backend cannot tell them apart.
+    """
+    if not job_id.startswith(scan_job_prefix(api_key_info)):
+        raise HTTPException(status_code=404, detail="Scan job not found")
+
+    job = AsyncResult(job_id, app=celery_app)
+    try:
+        state, info = await run_in_threadpool(lambda: (job.state, job.info))
+    except Exception as e:
+        logger.error(f"Failed to read scan job {job_id}: {e}")
+        raise HTTPException(status_code=503, detail="Scan job results temporarily unavailable")
+
+    if state == "SUCCESS":
+        return ScanJobResponse(job_id=job_id, status="completed", progress=1.0, result=ScanResponse(**info))
+    if state == "FAILURE":
+        logger.error(f"Scan job {job_id} failed: {info}")
+        return ScanJobResponse(job_id=job_id, status="failed", error="Internal server error during scanning")
+    if state in ("STARTED", "PROGRESS"):
+        progress = info.get("progress", 0.0) if isinstance(info, dict) else 0.0
+        return ScanJobResponse(job_id=job_id, status="running", progress=progress)
+    return ScanJobResponse(job_id=job_id, status="pending", progress=0.0)
+
+async def require_admin(x_admin_key: str = Header(None)) -> None:
+    """Allows a request only if it carries ADMIN_API_KEY in the X-Admin-Key header"""
+    if not config.ADMIN_API_KEY:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_admin_key or not secrets.compare_digest(x_admin_key, config.ADMIN_API_KEY):
+        raise HTTPException(status_code=401, detail="Admin key required in X-Admin-Key header")
+
+def rule_stats_response() -> RuleStatsResponse:
+    """The shared scanner's rule statistics, empty while instrumentation is off"""
+    rule_stats = scanner.rule_stats
+    return RuleStatsResponse(
+        enabled=rule_stats is not None,
+        rules=rule_stats.snapshot() if rule_stats is not None else {}
+    )
+
+@app.get("/admin/rule-stats", response_model=RuleStatsResponse, summary="Get per-rule scan statistics")
+async def get_rule_stats(_: None = Depends(require_admin)):
+    """
+    Report the time, runs, matches and comment-suppressed matches of each scan rule
+    since instrumentation was turned on or last reset.
+    """
+    return rule_stats_response()
+
+@app.post("/admin/rule-stats", response_model=RuleStatsResponse, summary="Switch per-rule scan statistics")
+async def update_rule_stats(
+    update: RuleStatsUpdate,
+    _: None = Depends(require_admin)
+):
+    """
+    Turn per-rule instrumentation on or off, or reset its statistics.
+
+    Turning it off drops the statistics; it adds a timer call per rule step while on.
+    """
+    if update.enabled is True:
+        scanner.enable_instrumentation()
+    elif update.enabled is False:
+        scanner.disable_instrumentation()
+    if update.reset and scanner.rule_stats is not None:
+        scanner.rule_stats.reset()
+    logger.info(f"Rule statistics {'enabled' if scanner.rule_stats is not None else 'disabled'}")
+    return rule_stats_response()
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics() -> Response:
+    """
+    Prometheus metrics of this server process in the text exposition format.
+    """
+    if not config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not found")
+    return Response(content=metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+# Mount static files last, so the catch-all mount at "/" does not shadow the API routes
+app.mount("/", StaticFiles(directory=".", html=True), name="static")
@@ -0,0 +1,304 @@
+"""
+Prometheus metrics of the XSS Scanner API
+
+Metrics live in the memory of each server process and are rendered in the
+Prometheus text exposition format by /metrics. Updates are plain attribute
+increments made from the event loop thread, so they take no locks; values
+other components already count, such as cache hit counters and pool backlogs,
+are read when the metrics are scraped rather than on every request. Under a
+multi-process server each worker serves its own metrics.
+"""
+import time
+import logging
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Starlette appends the charset to text/ media types
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Bucket upper bounds in seconds for request, scan and lookup latencies
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FINDINGS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Request methods labelled by name; clients can send any token as a method, so
+# the rest share the "other" label to keep the number of series bounded
+KNOWN_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+class _Value:
+    """A counter or gauge value of one label combination"""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+class _HistogramValue:
+    """Bucket counts and sum of one label combination"""
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+class Metric:
+    """
+    A metric family: one value per combination of label values.
+
+    Call labels() with the label values, in the order of labelnames, to get the
+    value to update; metrics without labels are updated directly. Updates must
+    be made from the event loop thread.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self) -> Any:
+        return _Value()
+
+    def labels(self, *values: str) -> Any:
+        """Returns the value of a label combination, creating it on first use"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        """Yields (sample name, labels, value) for every label combination"""
+        for values, child in list(self._children.items()):
+            yield self.name, list(zip(self.labelnames, values)), child.value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for sample_name, labels, value in self.samples():
+            lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines)
+
+class Counter(Metric):
+    """A value that only goes up"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+class Gauge(Metric):
+    """A value that goes up and down"""
+
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+class Histogram(Metric):
+    """Counts of observations in cumulative buckets, with their sum"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.bounds = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.bounds)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self) -> Iterator[Tuple[str, List[Tuple[str, str]], float]]:
+        for values, child in list(self._children.items()):
+            labels = list(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float("inf"),), child.counts):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + [("le", _format_value(bound))], cumulative
+            yield f"{self.name}_sum", labels, child.sum
+            yield f"{self.name}_count", labels, cumulative
+
+class MetricsRegistry:
+    """
+    The metrics rendered by /metrics.
+
+    Functions registered with collector() run before every render, to copy
+    values counted elsewhere into the registry's metrics.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, function: Callable[[], None]) -> Callable[[], None]:
+        """Registers a function to run before every render; usable as a decorator"""
+        self._collectors.append(function)
+        return function
+
+    def render(self) -> str:
+        """Returns every metric in the Prometheus text exposition format"""
+        for function in self._collectors:
+            try:
+                function()
+            except Exception as e:
+                logger.warning(f"Metrics collector {function.__name__} failed: {e}")
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+registry = MetricsRegistry()
+
+REQUEST_LATENCY = registry.register(Histogram(
+    "xss_scanner_request_duration_seconds", "Time to handle an HTTP request, by route",
+    ("method", "route", "status")
+))
+REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "xss_scanner_requests_in_flight", "HTTP requests being handled"
+))
+SCAN_DURATION = registry.register(Histogram(
+    "xss_scanner_scan_duration_seconds", "Time spent scanning one input, excluding cache hits"
+))
+SCAN_QUEUE_WAIT = registry.register(Histogram(
+    "xss_scanner_scan_queue_wait_seconds", "Time a scan waited for a worker"
+))
+SCAN_FINDINGS = registry.register(Histogram(
+    "xss_scanner_scan_findings", "Vulnerabilities found per scan, excluding cache hits",
+    buckets=FINDINGS_BUCKETS
+))
+SCANS = registry.register(Counter(
+    "xss_scanner_scans_total", "Inputs scanned, by whether the result came from a cache",
+    ("cached",)
+))
+BYTES_SCANNED = registry.register(Counter(
+    "xss_scanner_scanned_bytes_total", "UTF-8 size of the code submitted for scanning"
+))
+API_KEY_LOOKUP_LATENCY = registry.register(Histogram(
+    "xss_scanner_api_key_lookup_duration_seconds", "Time to validate an API key, by where it was found",
+    ("source",)
+))
+CACHE_HITS = registry.register(Counter(
+    "xss_scanner_cache_hits_total", "Cache lookups that found an entry", ("cache",)
+))
+CACHE_MISSES = registry.register(Counter(
+    "xss_scanner_cache_misses_total", "Cache lookups that found nothing", ("cache",)
+))
+CACHE_HIT_RATIO = registry.register(Gauge(
+    "xss_scanner_cache_hit_ratio", "Share of cache lookups that found an entry since startup", ("cache",)
+))
+EXECUTOR_TASKS = registry.register(Gauge(
+    "xss_scanner_executor_tasks", "Scan tasks submitted to a worker pool and not finished, by pool", ("pool",)
+))
+EXECUTOR_QUEUE_DEPTH = registry.register(Gauge(
+    "xss_scanner_executor_queue_depth", "Scan tasks waiting for a free worker, by pool", ("pool",)
+))
+
+def record_scan(scan_time: float, queue_wait: Optional[float], vulnerabilities_found: int) -> None:
+    """Records a scan that ran on a worker. Must be called from the event loop thread."""
+    SCANS.labels("false").inc()
+    SCAN_DURATION.observe(scan_time)
+    if queue_wait is not None:
+        SCAN_QUEUE_WAIT.observe(queue_wait)
+    SCAN_FINDINGS.observe(vulnerabilities_found)
+
+def record_cache_stats(cache: str, stats: Dict[str, Any]) -> None:
+    """Copies the counters of a cache's stats() into the cache metrics"""
+    hits = stats["hits"] + stats.get("negative_hits", 0)
+    CACHE_HITS.labels(cache).set(hits)
+    CACHE_MISSES.labels(cache).set(stats["misses"])
+    CACHE_HIT_RATIO.labels(cache).set(stats["hit_ratio"])
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times HTTP requests and counts those in flight.
+
+    Requests are labelled with the path template of the route that handled
+    them, such as /scan/jobs/{job_id}, so the number of series stays bounded;
+    requests no route matched are labelled "unmatched", and methods outside
+    KNOWN_METHODS "other".
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+        self._route_templates: Optional[Dict[Any, str]] = None
+
+    def _route_template(self, scope: Dict[str, Any]) -> str:
+        if self._route_templates is None:
+            # Routes are all registered by the first request
+            self._route_templates = {}
+            for route in scope["app"].router.routes:
+                endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+                self._route_templates[endpoint] = route.path_format
+        return self._route_templates.get(scope.get("endpoint"), "unmatched")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            method = scope["method"] if scope["method"] in KNOWN_METHODS else "other"
+            REQUEST_LATENCY.labels(method, self._route_template(scope), str(status)).observe(
+                time.perf_counter() - started
+            )
@@ -3,7 +3,30 @@ Pydantic models for XSS Scanner API with enhanced validation
 """
 from pydantic import BaseModel, Field, validator
 from typing import List, Dict, Any, Optional
-import re
+
+# Longest line XSSScanRequest accepts, in characters
+MAX_LINE_LENGTH = 10000
+
+def is_blank(code: str) -> bool:
+    """Whether code is empty or only whitespace, without copying it as strip() would"""
+    return not code or code.isspace()
+
+def exceeds_line_length(code: str, max_line_length: int = MAX_LINE_LENGTH) -> bool:
+    """
+    Whether a line of code, split at "\n", is longer than max_line_length characters.
+
+    Each step looks for the last line break within the max_line_length + 1
+    characters from the start of a line and moves past it, so the lines are
+    never copied and each character is examined at most twice.
+    """
+    start = 0
+    length = len(code)
+    while length - start > max_line_length:
+        line_break = code.rfind("\n", start, start + max_line_length + 1)
+        if line_break == -1:
+            return True
+        start = line_break + 1
+    return False
 
 class XSSScanRequest(BaseModel):
     """
@@ -16,27 +39,19 @@ class XSSScanRequest(BaseModel):
 
     @validator('code')
     def validate_code(cls, v):
-        """Validate the code input for security and content."""
-        if not v.strip():
+        """
+        Validate the code is not blank and has no line over MAX_LINE_LENGTH characters.
+
+        Both checks run over the code in place without copying it; whether it
+        is dangerous is left to the scanner.
+        """
+        if is_blank(v):
             raise ValueError('Code cannot be empty or only whitespace')
 
-        # Check for extremely long lines that might indicate malicious content
-        lines = v.split('\n')
-        if any(len(line) > 10000 for line in lines):
+        # Extremely long lines suggest minified or generated input
+        if exceeds_line_length(v):
             raise ValueError('Code contains lines that are too long')
 
-        # Basic content validation - reject obviously malicious content
-        dangerous_patterns = [
-            r'<script[^>]*>.*alert.*</script>',
-            r'javascript:.*alert',
-            r'eval\(.*alert',
-        ]
-
-        for pattern in dangerous_patterns:
-            if re.search(pattern, v, re.IGNORECASE):
-                logger.warning("Potentially malicious code detected in scan request")
-                # Don't reject, just log - let the scanner handle it
-
         return v
 
 class Vulnerability(BaseModel):
@@ -58,6 +73,27 @@ class Vulnerability(BaseModel):
     description: str = Field(..., description="Human-readable description of the vulnerability")
     severity: str = Field(default="medium", description="Severity level of the vulnerability")
 
+class ScanTimings(BaseModel):
+    """
+    Model for the server-side time of a scan request by phase, in seconds.
+
+    Attributes:
+        validation: Parsing and validating the request
+        auth: Validating the API key
+        queue_wait: Waiting for a free scan worker
+        prefilter: Indexing lines and finding the lines each rule can match on
+        regex_matching: Running the rules, apart from comment filtering
+        comment_filtering: Lexing comments and dropping matches inside them
+        serialization: Encoding the response
+    """
+    validation: float = Field(0.0, description="Parsing and validating the request")
+    auth: float = Field(0.0, description="Validating the API key")
+    queue_wait: float = Field(0.0, description="Waiting for a free scan worker")
+    prefilter: float = Field(0.0, description="Finding the lines each rule can match on")
+    regex_matching: float = Field(0.0, description="Running the rules, apart from comment filtering")
+    comment_filtering: float = Field(0.0, description="Dropping matches inside comments")
+    serialization: float = Field(0.0, description="Encoding the response")
+
 class ScanResponse(BaseModel):
     """
     Model for the scan response with comprehensive metadata.
@@ -68,14 +104,116 @@ class ScanResponse(BaseModel):
         vulnerabilities: List of detected vulnerabilities
         message: Human-readable message about the scan results
         scan_duration: Time taken for the scan in seconds
+        queue_wait: Time the scan waited for a free worker in seconds
         code_length: Length of the scanned code
+        partial: Whether the scan stopped early because it ran out of time
+        timed_out_rule: Rule that was running when the time budget ran out
+        timings: Time spent in each phase of the request, when asked for
     """
     status: str = Field(..., description="Status of the scan operation")
     vulnerabilities_found: int = Field(..., ge=0, description="Number of vulnerabilities detected")
     vulnerabilities: List[Vulnerability] = Field(..., description="List of detected vulnerabilities")
     message: str = Field(..., description="Human-readable message about the scan results")
     scan_duration: Optional[float] = Field(None, description="Time taken for the scan in seconds")
+    queue_wait: Optional[float] = Field(None, description="Time the scan waited for a free worker in seconds")
     code_length: Optional[int] = Field(None, description="Length of the scanned code")
+    partial: bool = Field(False, description="Whether the scan stopped early because it ran out of time")
+    timed_out_rule: Optional[str] = Field(None, description="Rule that was running when the time budget ran out")
+    timings: Optional[ScanTimings] = Field(None, description="Time spent in each phase of the request, when asked for")
+
+class BatchScanItem(XSSScanRequest):
+    """
+    Model for one named snippet in a batch scan request.
+
+    Attributes:
+        name: Client-chosen name of the snippet, such as its file path
+        code: The HTML/JavaScript code to scan for vulnerabilities
+    """
+    name: str = Field(..., min_length=1, max_length=1024, description="Name of the snippet, such as its file path")
+
+class BatchScanRequest(BaseModel):
+    """
+    Model for a batch scan request.
+
+    Attributes:
+        items: The snippets to scan
+    """
+    items: List[BatchScanItem] = Field(..., min_length=1, description="The snippets to scan")
+
+class DiffScanRequest(BaseModel):
+    """
+    Model for an incremental scan of the files a diff changes.
+
+    Attributes:
+        diff: Unified diff of the change, such as the output of git diff
+        files: New contents of the changed files, named by their paths in the diff
+        context_lines: Also report findings this many lines from a changed line
+    """
+    diff: str = Field(..., min_length=1, description="Unified diff of the change")
+    files: List[BatchScanItem] = Field(..., min_length=1, description="New contents of the changed files, named by path")
+    context_lines: int = Field(0, ge=0, le=1000, description="Also report findings this many lines from a changed line")
+
+class BatchScanItemResponse(ScanResponse):
+    """
+    Model for the scan result of one batch item.
+
+    Attributes:
+        name: Name of the snippet the result belongs to
+    """
+    name: str = Field(..., description="Name of the snippet the result belongs to")
+
+class BatchScanResponse(BaseModel):
+    """
+    Model for the batch scan response.
+
+    Attributes:
+        status: Status of the batch operation
+        items_scanned: Number of snippets scanned
+        vulnerabilities_found: Total vulnerabilities across all snippets
+        results: Per-snippet scan results, in request order
+        scan_duration: Time taken for the whole batch in seconds
+    """
+    status: str = Field(..., description="Status of the batch operation")
+    items_scanned: int = Field(..., ge=0, description="Number of snippets scanned")
+    vulnerabilities_found: int = Field(..., ge=0, description="Total vulnerabilities across all snippets")
+    results: List[BatchScanItemResponse] = Field(..., description="Per-snippet scan results, in request order")
+    scan_duration: Optional[float] = Field(None, description="Time taken for the whole batch in seconds")
+
+class ScanJobRequest(BaseModel):
+    """
+    Model for a background scan job request.
+
+    Unlike XSSScanRequest it accepts inputs beyond the /scan size limit and
+    long minified lines; the size limit is checked by the endpoint.
+
+    Attributes:
+        code: The HTML/JavaScript code to scan for vulnerabilities
+    """
+    code: str = Field(..., min_length=1, description="The code to scan for XSS vulnerabilities")
+
+    @validator('code')
+    def validate_code(cls, v):
+        """Validate the code input is not blank."""
+        if is_blank(v):
+            raise ValueError('Code cannot be empty or only whitespace')
+        return v
+
+class ScanJobResponse(BaseModel):
+    """
+    Model for the status of a background scan job.
+
+    Attributes:
+        job_id: Identifier to poll the job with
+        status: One of pending, running, completed or failed
+        progress: Share of the code scanned so far, from 0 to 1
+        result: Scan results once the job has completed
+        error: Error message if the job failed
+    """
+    job_id: str = Field(..., description="Identifier to poll the job with")
+    status: str = Field(..., description="One of pending, running, completed or failed")
+    progress: Optional[float] = Field(None, ge=0, le=1, description="Share of the code scanned so far")
+    result: Optional[ScanResponse] = Field(None, description="Scan results once the job has completed")
+    error: Optional[str] = Field(None, description="Error message if the job failed")
 
 class HealthResponse(BaseModel):
     """
@@ -94,6 +232,43 @@ class HealthResponse(BaseModel):
     timestamp: Optional[str] = Field(None, description="Time of the health check")
     version: Optional[str] = Field(None, description="API version")
 
+class RuleStatsEntry(BaseModel):
+    """
+    Model for the cumulative statistics of one scan rule.
+
+    Attributes:
+        seconds: Time spent running the rule
+        invocations: Number of runs of the rule over a document or chunk
+        matches: Number of matches, including suppressed ones
+        suppressed: Number of matches dropped because they were inside a comment
+    """
+    seconds: float = Field(..., description="Time spent running the rule")
+    invocations: int = Field(..., description="Number of runs of the rule over a document or chunk")
+    matches: int = Field(..., description="Number of matches, including suppressed ones")
+    suppressed: int = Field(..., description="Number of matches inside comments")
+
+class RuleStatsResponse(BaseModel):
+    """
+    Model for the scanner's per-rule instrumentation.
+
+    Attributes:
+        enabled: Whether rule statistics are being recorded
+        rules: Statistics by rule name, slowest rule first
+    """
+    enabled: bool = Field(..., description="Whether rule statistics are being recorded")
+    rules: Dict[str, RuleStatsEntry] = Field(default_factory=dict, description="Statistics by rule name")
+
+class RuleStatsUpdate(BaseModel):
+    """
+    Model for switching the scanner's per-rule instrumentation.
+
+    Attributes:
+        enabled: Turn recording on or off, or None to leave it as it is
+        reset: Clear the statistics recorded so far
+    """
+    enabled: Optional[bool] = Field(None, description="Turn recording on or off")
+    reset: bool = Field(False, description="Clear the statistics recorded so far")
+
 class APIKeyDocument(BaseModel):
     """
     Model for API key document from database with enhanced validation.
@@ -105,6 +280,7 @@ class APIKeyDocument(BaseModel):
         created_at: Creation timestamp
         last_used: Last usage timestamp
         usage_count: Number of times the key has been used
+        bytes_scanned: Total size of the code scanned with the key
     """
     key: str = Field(..., description="The API key string")
     is_active: bool = Field(..., description="Whether the key is active")
@@ -112,6 +288,7 @@ class APIKeyDocument(BaseModel):
     created_at: Optional[str] = Field(None, description="Creation timestamp")
     last_used: Optional[str] = Field(None, description="Last usage timestamp")
     usage_count: Optional[int] = Field(0, description="Number of times the key has been used")
+    bytes_scanned: Optional[int] = Field(0, description="Total size of the code scanned with the key")
 
     @validator('key')
     def validate_api_key(cls, v):
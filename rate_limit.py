@@ -0,0 +1,151 @@
+"""
+Per-API-key rate limiting for the XSS Scanner API
+"""
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Any, NamedTuple
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class RateLimitDecision(NamedTuple):
+    """Outcome of a rate limit check"""
+    allowed: bool
+    remaining: float
+    retry_after: float
+
+def request_cost(bytes_scanned: int, bytes_per_token: int = config.RATE_LIMIT_BYTES_PER_TOKEN) -> int:
+    """
+    Returns the tokens a request costs: one, plus one per bytes_per_token scanned.
+
+    Args:
+        bytes_scanned: UTF-8 size of the code in the request
+        bytes_per_token: Bytes of code covered by one token
+
+    Returns:
+        Token cost of the request
+    """
+    return 1 + bytes_scanned // bytes_per_token
+
+def hash_api_key(api_key: str) -> str:
+    """Bucket name for a key, so raw keys are never used as cache or Redis keys"""
+    return hashlib.sha256(api_key.encode("utf-8", "surrogatepass")).hexdigest()
+
+class RateLimiter:
+    """
+    In-process token bucket per API key.
+
+    Each bucket holds up to burst tokens and refills at per_minute tokens a
+    minute. A request takes request_cost(bytes) tokens, capped at burst so the
+    largest request still fits a full bucket. Buckets live in an LRU bounded by
+    max_keys; an evicted bucket starts full again.
+    """
+
+    def __init__(
+        self,
+        per_minute: int = config.RATE_LIMIT_PER_MINUTE,
+        burst: int = config.RATE_LIMIT_BURST,
+        max_keys: int = 100000
+    ):
+        self.per_minute = per_minute
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0
+
+    async def acquire(self, api_key: str, cost: int) -> RateLimitDecision:
+        """
+        Takes cost tokens from the key's bucket if it has them.
+
+        Args:
+            api_key: The API key
+            cost: Tokens the request costs
+
+        Returns:
+            Whether the request is allowed, the tokens left and, when it is not,
+            the seconds until the bucket holds enough tokens
+        """
+        if not self.enabled:
+            return RateLimitDecision(True, float(self.burst), 0.0)
+
+        rate = self.per_minute / 60
+        cost = min(cost, self.burst)
+        bucket_name = hash_api_key(api_key)
+        now = time.monotonic()
+
+        tokens, updated = self._buckets.pop(bucket_name, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * rate)
+        if tokens >= cost:
+            decision = RateLimitDecision(True, tokens - cost, 0.0)
+        else:
+            decision = RateLimitDecision(False, tokens, (cost - tokens) / rate)
+
+        self._buckets[bucket_name] = (decision.remaining, now)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return decision
+
+# Token bucket update, atomic in Redis. Uses the server clock so every
+# instance refills buckets at the same pace.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((burst - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Token bucket per API key shared through Redis by every worker and instance.
+
+    Each check is one atomic Lua script call. If Redis cannot be reached the
+    request is allowed, so a Redis outage does not take the API down.
+    """
+
+    def __init__(self, client: Any, prefix: str = "xss-rate:", **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, api_key: str, cost: int) -> RateLimitDecision:
+        if not self.enabled:
+            return RateLimitDecision(True, float(self.burst), 0.0)
+
+        try:
+            allowed, remaining, retry_after = await self._script(
+                keys=[self.prefix + hash_api_key(api_key)],
+                args=[self.per_minute / 60, self.burst, min(cost, self.burst)]
+            )
+        except Exception as e:
+            logger.warning(f"Redis rate limit check failed, allowing request: {e}")
+            return RateLimitDecision(True, 0.0, 0.0)
+        return RateLimitDecision(bool(allowed), float(remaining), float(retry_after))
+
+# Global in-process rate limiter
+rate_limiter = RateLimiter()
@@ -0,0 +1,164 @@
+"""
+Regex matching backends for the XSS scanner
+"""
+import re
+from typing import Any, Iterator, Optional
+
+# Contents of RE2 character classes matching what Python's \s, \w and \d match in
+# str patterns. RE2's own shorthands are ASCII-only. Its Unicode tables may be
+# newer than Python's, which only matters for code points Python leaves unassigned.
+UNICODE_CLASSES = {
+    "s": "\\t-\\r\\x1c-\\x20\\x85\\xa0\\x{1680}\\x{2000}-\\x{200a}\\x{2028}\\x{2029}\\x{202f}\\x{205f}\\x{3000}",
+    "w": "\\p{L}\\p{N}_",
+    "d": "\\p{Nd}",
+}
+
+class RegexBackend:
+    """Standard library re backend; compiled patterns are used as they are"""
+
+    name = "re"
+    error = re.error
+
+    def compile(self, pattern: str, flags: int = 0) -> Any:
+        """
+        Compiles a rule pattern.
+
+        Args:
+            pattern: The regex pattern
+            flags: re module flags
+
+        Returns:
+            Compiled pattern exposing finditer() and pattern
+        """
+        return re.compile(pattern, flags)
+
+class OffsetMatch:
+    """A match found in a window of the document, reported at document offsets"""
+
+    __slots__ = ("_match", "_offset")
+
+    def __init__(self, match: Any, offset: int):
+        self._match = match
+        self._offset = offset
+
+    def start(self) -> int:
+        return self._match.start() + self._offset
+
+    def end(self) -> int:
+        return self._match.end() + self._offset
+
+    def span(self):
+        return self.start(), self.end()
+
+    def group(self) -> str:
+        return self._match.group()
+
+class RE2Pattern:
+    """
+    Compiled RE2 expression exposing the part of the re.Pattern API the scanner uses.
+
+    google-re2 re-encodes str input to UTF-8 on every call, so searching a small
+    window of a large document with pos/endpos costs as much as searching all of it.
+    The window is sliced out first to keep each call proportional to its size.
+    """
+
+    def __init__(self, regexp: Any, pattern: str):
+        self._regexp = regexp
+        self.pattern = pattern
+
+    def finditer(self, string: str, pos: int = 0, endpos: Optional[int] = None) -> Iterator[Any]:
+        if pos == 0 and endpos is None:
+            yield from self._regexp.finditer(string)
+            return
+        for match in self._regexp.finditer(string[pos:endpos]):
+            yield OffsetMatch(match, pos)
+
+class RE2Backend(RegexBackend):
+    """
+    Linear-time backend built on google-re2.
+
+    RE2 never backtracks, so matching time is bounded by the input size whatever the
+    pattern. It has no lookaround or backreferences; rules using them are compiled
+    with re instead by the scanner. Shorthand classes are rewritten to match
+    Unicode as re does, see unicode_classes().
+    """
+
+    name = "re2"
+
+    def __init__(self):
+        import re2
+        self._re2 = re2
+        self.error = re2.error
+
+    def unicode_classes(self, pattern: str) -> str:
+        """
+        Rewrites \\s, \\w and \\d, and their negations, into Unicode-aware RE2 classes.
+
+        Raises:
+            error: For \\b and \\B, whose word characters RE2 cannot widen, and for
+                negated shorthands inside a character class
+        """
+        parts = []
+        in_class = False
+        position = 0
+        while position < len(pattern):
+            character = pattern[position]
+            if character == "\\" and position + 1 < len(pattern):
+                escape = pattern[position + 1]
+                if escape in UNICODE_CLASSES:
+                    parts.append(UNICODE_CLASSES[escape] if in_class else f"[{UNICODE_CLASSES[escape]}]")
+                elif escape.lower() in UNICODE_CLASSES and not in_class:
+                    parts.append(f"[^{UNICODE_CLASSES[escape.lower()]}]")
+                elif escape in "SWDbB":
+                    raise self.error(f"\\{escape} cannot match Unicode as re does")
+                else:
+                    parts.append(pattern[position:position + 2])
+                position += 2
+                continue
+            if character == "[" and not in_class:
+                in_class = True
+                # A leading ] (after an optional ^) is a literal, not the end of the class
+                opening = re.match(r"\[\^?\]?", pattern[position:]).group()
+                parts.append(opening)
+                position += len(opening)
+                continue
+            if character == "]" and in_class:
+                in_class = False
+            parts.append(character)
+            position += 1
+        return "".join(parts)
+
+    def compile(self, pattern: str, flags: int = 0) -> Any:
+        options = self._re2.Options()
+        options.case_sensitive = not flags & re.IGNORECASE
+        options.dot_nl = bool(flags & re.DOTALL)
+        options.log_errors = False
+        return RE2Pattern(self._re2.compile(self.unicode_classes(pattern), options), pattern)
+
+REGEX_BACKENDS = {
+    RegexBackend.name: RegexBackend,
+    RE2Backend.name: RE2Backend,
+}
+
+def get_regex_backend(name: str) -> RegexBackend:
+    """
+    Returns the matching backend with the given name.
+
+    Args:
+        name: Backend name from REGEX_BACKENDS
+
+    Returns:
+        Backend instance
+
+    Raises:
+        ValueError: If the name is not a known backend
+        ImportError: If the backend's engine is not installed; an explicit
+            request for a linear-time engine is not downgraded to re
+    """
+    if name not in REGEX_BACKENDS:
+        raise ValueError(f"Unknown regex backend '{name}'. Available: {', '.join(REGEX_BACKENDS)}")
+
+    try:
+        return REGEX_BACKENDS[name]()
+    except ImportError as e:
+        raise ImportError(f"Regex backend '{name}' is not available ({e}); install google-re2 or set REGEX_BACKEND=re") from e
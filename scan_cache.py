@@ -0,0 +1,176 @@
+"""
+Scan result caching for the XSS scanner
+"""
+import json
+import time
+import zlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class ScanResultCache:
+    """
+    Thread-safe in-memory LRU cache of scan results with a time to live.
+
+    Keys come from XSSScanner.cache_key, which covers the code and the
+    ruleset, so entries for an older ruleset are never looked up again and
+    age out through LRU eviction.
+    """
+
+    def __init__(self, max_entries: int = config.SCAN_CACHE_MAX_ENTRIES, ttl: float = config.SCAN_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the cached result for a key, or None on a miss.
+
+        Args:
+            key: Cache key from XSSScanner.cache_key
+
+        Returns:
+            The cached scan result, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, result = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, result: Dict[str, Any]) -> None:
+        """
+        Stores a result, evicting the least recently used entries beyond max_entries.
+
+        Args:
+            key: Cache key from XSSScanner.cache_key
+            result: The scan result
+        """
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drops every entry"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit and miss counters and the current size"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+class RedisScanCache:
+    """
+    Scan result cache shared through Redis by every worker and instance.
+
+    Results are stored as zlib-compressed compact JSON under the same keys as
+    the in-memory cache, so the ruleset version is part of every key. Lookups
+    and stores for several results go out in one round trip. Redis errors and
+    entries that do not decode are logged and treated as misses so a cache
+    outage never fails a scan.
+    """
+
+    def __init__(self, client: Any, ttl: float = config.SCAN_CACHE_REDIS_TTL, prefix: str = "xss-scan:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @staticmethod
+    def serialize(result: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(result, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def deserialize(data: bytes) -> Dict[str, Any]:
+        return json.loads(zlib.decompress(data))
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Looks up several results with a single MGET.
+
+        Args:
+            keys: Cache keys from XSSScanner.cache_key
+
+        Returns:
+            The cached results, None for misses and undecodable entries, in the
+            order of keys
+        """
+        if not keys:
+            return []
+        try:
+            values = await self.client.mget([self.prefix + key for key in keys])
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis scan cache lookup failed: {e}")
+            return [None] * len(keys)
+
+        results = []
+        for key, value in zip(keys, values):
+            result = None
+            if value is not None:
+                try:
+                    result = self.deserialize(value)
+                except (zlib.error, ValueError) as e:
+                    # A corrupt or truncated entry is a miss; the scan overwrites it
+                    self.errors += 1
+                    logger.warning(f"Redis scan cache entry {key} could not be decoded: {e}")
+            results.append(result)
+        found = sum(result is not None for result in results)
+        self.hits += found
+        self.misses += len(results) - found
+        return results
+
+    async def set_many(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Stores several results in one pipelined round trip.
+
+        Args:
+            results: Scan results by cache key
+        """
+        if not results:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, result in results.items():
+                    pipe.set(self.prefix + key, self.serialize(result), ex=int(self.ttl))
+                await pipe.execute()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Redis scan cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Returns hit, miss and error counters"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_ratio": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,381 @@
+"""
+Executor that runs scans off the event loop
+"""
+import asyncio
+import logging
+import time
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Callable, Dict, Any, AsyncIterator, List, Optional, Tuple
+
+import metrics
+from config import config
+from scan_cache import RedisScanCache
+from utils import RuleStats, XSSScanner, cacheable_result, scanner
+
+logger = logging.getLogger(__name__)
+
+# Findings fetched from a streaming scan per trip to the thread pool
+STREAM_BATCH_SIZE = 20
+
+# Scanner of a process pool worker, built once when the worker starts
+_worker_scanner: Optional[XSSScanner] = None
+
+def _init_process_worker() -> None:
+    """Process pool initializer: compiles the worker's rules before its first scan"""
+    global _worker_scanner
+    _worker_scanner = XSSScanner()
+
+def _timed_scan(
+    scanner_instance: XSSScanner,
+    code: str,
+    time_budget: Optional[float],
+    executor: Optional[Executor] = None,
+    timings: bool = False
+) -> Tuple[Dict[str, Any], float]:
+    """Runs a scan and returns its result with the time spent scanning; caching is left to the caller"""
+    started = time.perf_counter()
+    result = scanner_instance.scan_code(code, time_budget, use_cache=False, executor=executor, timings=timings)
+    return result, time.perf_counter() - started
+
+def _timed_scan_group(
+    scanner_instance: XSSScanner,
+    codes: List[str],
+    time_budget: Optional[float],
+    executor: Optional[Executor] = None
+) -> List[Tuple[Any, float]]:
+    """Scans several snippets in one task; a failed scan is returned as its exception"""
+    results = []
+    for code in codes:
+        try:
+            results.append(_timed_scan(scanner_instance, code, time_budget, executor))
+        except Exception as e:
+            results.append((e, 0.0))
+    return results
+
+def _instrumented_worker_scanner(instrument: bool) -> XSSScanner:
+    """The worker's scanner, recording rule statistics for this task only if instrument is set"""
+    worker_scanner = _worker_scanner or scanner
+    worker_scanner.rule_stats = RuleStats() if instrument else None
+    return worker_scanner
+
+def _process_scan(
+    code: str,
+    time_budget: Optional[float],
+    instrument: bool = False,
+    timings: bool = False
+) -> Tuple[Dict[str, Any], float, Optional[Dict[str, List[float]]]]:
+    """Scan entry point inside a process pool worker; also returns its RuleStats table when instrumented"""
+    worker_scanner = _instrumented_worker_scanner(instrument)
+    result, scan_time = _timed_scan(worker_scanner, code, time_budget, timings=timings)
+    return result, scan_time, worker_scanner.rule_stats and worker_scanner.rule_stats.take()
+
+def _process_scan_group(
+    codes: List[str],
+    time_budget: Optional[float],
+    instrument: bool = False
+) -> Tuple[List[Tuple[Any, float]], Optional[Dict[str, List[float]]]]:
+    """Group scan entry point inside a process pool worker; also returns its RuleStats table when instrumented"""
+    worker_scanner = _instrumented_worker_scanner(instrument)
+    results = _timed_scan_group(worker_scanner, codes, time_budget)
+    return results, worker_scanner.rule_stats and worker_scanner.rule_stats.take()
+
+def _merge_worker_stats(rule_table: Optional[Dict[str, List[float]]]) -> None:
+    """Adds the rule statistics a process pool worker recorded to the shared scanner's"""
+    rule_stats = scanner.rule_stats
+    if rule_table and rule_stats is not None:
+        rule_stats.merge(rule_table)
+
+class ScanExecutor:
+    """
+    Dispatches scans to worker pools so they never block the event loop.
+
+    Inputs shorter than process_threshold characters run on a thread pool with
+    the shared scanner. Larger inputs go to a process pool whose workers each hold
+    a pre-compiled XSSScanner, so they scan in parallel instead of taking turns on
+    the GIL. Pools are created on first use; start() creates them up front and
+    spawns the worker processes.
+
+    Inputs the scanner keeps at least parallel_threshold characters of are
+    scanned from a thread that splits them into chunks for the process pool.
+
+    The shared scanner's result cache, then shared_cache when one is set, are
+    checked before dispatching and filled with the results that come back, so
+    cache hits never reach a worker. While the shared scanner is instrumented,
+    worker processes record rule statistics too and hand them back with results.
+
+    tasks counts the tasks submitted to each pool that have not finished yet,
+    from which queue_depth() derives the backlog waiting for a worker.
+    """
+
+    def __init__(
+        self,
+        thread_workers: int = config.SCAN_THREAD_WORKERS,
+        process_workers: int = config.SCAN_PROCESS_WORKERS,
+        process_threshold: int = config.SCAN_PROCESS_THRESHOLD,
+        shared_cache: Optional[RedisScanCache] = None
+    ):
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.process_threshold = process_threshold
+        self.shared_cache = shared_cache
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self.tasks = {"thread": 0, "process": 0}
+
+    @property
+    def thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="scan"
+            )
+        return self._thread_pool
+
+    @property
+    def process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._process_pool is None and self.process_workers > 0:
+            # Spawned workers do not inherit the server's threads or sockets
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker
+            )
+        return self._process_pool
+
+    def uses_process_pool(self, code_length: int) -> bool:
+        """Whether a scan of this many characters is sent to the process pool"""
+        return self.process_workers > 0 and code_length >= self.process_threshold
+
+    def uses_chunks(self, code_length: int) -> bool:
+        """Whether a scan of this many characters is split into chunks for the process pool"""
+        return self.process_workers > 0 and min(code_length, scanner.max_code_length) >= scanner.parallel_threshold
+
+    def queue_depth(self, pool: str) -> int:
+        """Tasks submitted to a pool, "thread" or "process", that are waiting for a free worker"""
+        workers = self.thread_workers if pool == "thread" else self.process_workers
+        return max(self.tasks[pool] - workers, 0)
+
+    async def _run(self, pool: str, function: Callable, *args: Any) -> Any:
+        """Runs function on a pool, "thread" or "process", counting it in tasks while it is pending"""
+        executor = self.thread_pool if pool == "thread" else self.process_pool
+        self.tasks[pool] += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+        finally:
+            self.tasks[pool] -= 1
+
+    def start(self) -> None:
+        """Creates the pools and waits for every worker process to be ready"""
+        self.thread_pool
+        if self.process_pool is not None:
+            wait([self.process_pool.submit(time.sleep, 0.05) for _ in range(self.process_workers)])
+            logger.info(f"Scan executor started: {self.thread_workers} threads, {self.process_workers} processes")
+
+    def shutdown(self) -> None:
+        """Stops the pools, letting running scans finish"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=True, cancel_futures=True)
+            self._thread_pool = None
+
+    async def get_cached_results(self, keys: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Looks results up in the scanner's cache, then the shared cache for the misses.
+
+        Shared cache hits are copied into the scanner's cache.
+
+        Args:
+            keys: Cache keys from XSSScanner.cache_key
+
+        Returns:
+            The cached results, None for misses, in the order of keys
+        """
+        results = [scanner.get_cached_result(key) for key in keys]
+        missing = [position for position, result in enumerate(results) if result is None]
+        if self.shared_cache is not None and missing:
+            shared_results = await self.shared_cache.get_many([keys[position] for position in missing])
+            for position, result in zip(missing, shared_results):
+                if result is not None:
+                    scanner.cache_result(keys[position], result)
+                    results[position] = result
+        return results
+
+    async def cache_results(self, results: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Stores complete scan results in the scanner's cache and the shared cache.
+
+        Args:
+            results: Scan results by cache key
+        """
+        results = {key: cacheable_result(result) for key, result in results.items() if not result.get("partial")}
+        for key, result in results.items():
+            scanner.cache_result(key, result)
+        if self.shared_cache is not None:
+            await self.shared_cache.set_many(results)
+
+    async def scan(
+        self,
+        code: str,
+        time_budget: Optional[float] = None,
+        timings: bool = False
+    ) -> Tuple[Dict[str, Any], float, float]:
+        """
+        Scans code on a worker pool.
+
+        Args:
+            code: The HTML/JavaScript code to analyze
+            time_budget: Seconds the scan may take, defaults to the scanner's budget
+            timings: Whether the result should carry the scanner's phase timings,
+                see XSSScanner.scan_code; cache hits carry none
+
+        Returns:
+            Tuple of (scan result, seconds waiting for a worker, seconds scanning)
+        """
+        key = scanner.cache_key(code)
+        cached_result, = await self.get_cached_results([key])
+        if cached_result is not None:
+            metrics.SCANS.labels("true").inc()
+            return cached_result, 0.0, 0.0
+
+        submitted = time.perf_counter()
+        if self.uses_chunks(len(code)):
+            result, scan_time = await self._run(
+                "thread", _timed_scan, scanner, code, time_budget, self.process_pool, timings
+            )
+        elif self.uses_process_pool(len(code)):
+            result, scan_time, rule_table = await self._run(
+                "process", _process_scan, code, time_budget, scanner.rule_stats is not None, timings
+            )
+            _merge_worker_stats(rule_table)
+        else:
+            result, scan_time = await self._run("thread", _timed_scan, scanner, code, time_budget, None, timings)
+        queue_wait = max(time.perf_counter() - submitted - scan_time, 0.0)
+        metrics.record_scan(scan_time, queue_wait, result["vulnerabilities_found"])
+        await self.cache_results({key: result})
+        return result, queue_wait, scan_time
+
+    async def iter_scan(
+        self,
+        code: str,
+        time_budget: Optional[float] = None,
+        summary: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streams the findings of a scan as the scanner produces them.
+
+        The scanner's iter_findings generator is advanced on the thread pool,
+        STREAM_BATCH_SIZE findings per trip, so the event loop only handles
+        findings that are ready.
+
+        Args:
+            code: The HTML/JavaScript code to analyze
+            time_budget: Seconds the scan may take, defaults to the scanner's budget
+            summary: Optional dictionary that receives the scan summary, as in
+                XSSScanner.iter_findings
+
+        Yields:
+            Vulnerability dictionaries
+        """
+        key = scanner.cache_key(code)
+        cached_result, = await self.get_cached_results([key])
+        if cached_result is not None:
+            metrics.SCANS.labels("true").inc()
+            if summary is not None:
+                summary.update({key: value for key, value in cached_result.items() if key != "vulnerabilities"})
+            for finding in cached_result["vulnerabilities"]:
+                yield finding
+            return
+
+        scan_summary = {}
+        vulnerabilities = []
+        scan_time = 0.0
+        findings = scanner.iter_findings(code, time_budget, scan_summary)
+        while True:
+            started = time.perf_counter()
+            batch = await self._run("thread", list, islice(findings, STREAM_BATCH_SIZE))
+            scan_time += time.perf_counter() - started
+            vulnerabilities.extend(batch)
+            for finding in batch:
+                yield finding
+            if len(batch) < STREAM_BATCH_SIZE:
+                break
+
+        # Time between batches is spent waiting on the client, so only the trips
+        # to the pool count; their queue waits are not told apart
+        metrics.record_scan(scan_time, None, len(vulnerabilities))
+        if summary is not None:
+            summary.update(scan_summary)
+        await self.cache_results({key: {**scan_summary, "vulnerabilities": vulnerabilities}})
+
+    async def scan_many(self, codes: List[str], time_budget: Optional[float] = None) -> List[Tuple[Any, float, float]]:
+        """
+        Scans several snippets in parallel on the worker pools.
+
+        Snippets are packed in order into groups of about process_threshold
+        characters, so each task carries enough work to be worth dispatching to a
+        worker process; a trailing group below the threshold runs on the thread pool.
+        Snippets long enough to be split into chunks are scanned on their own, in
+        chunks, and snippets with a cached result are not dispatched at all.
+
+        Args:
+            codes: The snippets to scan
+            time_budget: Seconds each scan may take, defaults to the scanner's budget
+
+        Returns:
+            List of (scan result or the exception it raised, seconds waiting for a
+            worker, seconds scanning), in the order of codes
+        """
+        keys = [scanner.cache_key(code) for code in codes]
+        cached_results = await self.get_cached_results(keys)
+
+        results: List[Any] = [None] * len(codes)
+        groups = []
+        group, group_length = [], 0
+        for position, code in enumerate(codes):
+            if cached_results[position] is not None:
+                metrics.SCANS.labels("true").inc()
+                results[position] = (cached_results[position], 0.0, 0.0)
+                continue
+            if self.uses_chunks(len(code)):
+                groups.append(([(position, code)], len(code)))
+                continue
+            group.append((position, code))
+            group_length += len(code)
+            if group_length >= self.process_threshold:
+                groups.append((group, group_length))
+                group, group_length = [], 0
+        if group:
+            groups.append((group, group_length))
+
+        scanned_results = {}
+
+        async def scan_group(group: List[Tuple[int, str]], group_length: int) -> None:
+            group_codes = [code for _, code in group]
+            submitted = time.perf_counter()
+            if len(group) == 1 and self.uses_chunks(group_length):
+                group_results = await self._run(
+                    "thread", _timed_scan_group, scanner, group_codes, time_budget, self.process_pool
+                )
+            elif self.uses_process_pool(group_length):
+                group_results, rule_table = await self._run(
+                    "process", _process_scan_group, group_codes, time_budget, scanner.rule_stats is not None
+                )
+                _merge_worker_stats(rule_table)
+            else:
+                group_results = await self._run("thread", _timed_scan_group, scanner, group_codes, time_budget)
+            queue_wait = max(time.perf_counter() - submitted - sum(scan_time for _, scan_time in group_results), 0.0)
+            for (position, _), (result, scan_time) in zip(group, group_results):
+                if not isinstance(result, Exception):
+                    scanned_results[keys[position]] = result
+                    metrics.record_scan(scan_time, queue_wait, result["vulnerabilities_found"])
+                results[position] = (result, queue_wait, scan_time)
+
+        await asyncio.gather(*(scan_group(group, length) for group, length in groups))
+        await self.cache_results(scanned_results)
+        return results
+
+# Global executor instance
+scan_executor = ScanExecutor()
@@ -0,0 +1,125 @@
+"""
+Celery tasks for asynchronous scan jobs
+
+Run a worker with:
+    celery -A tasks worker --loglevel=info
+
+Point CELERY_BROKER_URL and CELERY_RESULT_BACKEND at Redis to run workers as
+separate processes. With the default memory:// broker no worker in another
+process could receive the jobs, so the API refuses them, see can_queue_jobs.
+Setting CELERY_TASK_ALWAYS_EAGER runs them in the process that queues them,
+during the request, with results kept in the cache+memory:// result backend;
+this is meant for tests and local development.
+"""
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional
+
+from celery import Celery
+
+from config import config
+from utils import XSSScanner
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery(
+    "xss_scanner",
+    broker=config.CELERY_BROKER_URL,
+    backend=config.CELERY_RESULT_BACKEND
+)
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    task_track_started=True,
+    result_expires=config.SCAN_JOB_RESULT_EXPIRES,
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_always_eager=config.CELERY_TASK_ALWAYS_EAGER,
+    task_store_eager_result=True
+)
+
+def can_queue_jobs() -> bool:
+    """Whether queued jobs will run, on workers behind a real broker or eagerly"""
+    return celery_app.conf.task_always_eager or not config.CELERY_BROKER_URL.startswith("memory://")
+
+# Seconds between progress updates of a running job
+PROGRESS_INTERVAL = 0.5
+
+# Scanner of a worker process, built on its first job
+_job_scanner: Optional[XSSScanner] = None
+
+def get_job_scanner() -> XSSScanner:
+    """Returns the worker's scanner, sized for job inputs rather than /scan requests"""
+    global _job_scanner
+    if _job_scanner is None:
+        _job_scanner = XSSScanner()
+        _job_scanner.max_code_length = config.SCAN_JOB_MAX_CODE_LENGTH
+        _job_scanner.max_vulnerabilities = config.SCAN_JOB_MAX_VULNERABILITIES
+        _job_scanner.time_budget = config.SCAN_JOB_TIME_BUDGET
+    return _job_scanner
+
+# Process pool of a worker process for scanning large jobs in chunks, created on first use
+_chunk_pool: Optional[ProcessPoolExecutor] = None
+
+def get_chunk_pool() -> Optional[ProcessPoolExecutor]:
+    """Returns the worker's chunk scanning pool, or None when SCAN_CHUNK_WORKERS is below 2"""
+    global _chunk_pool
+    if _chunk_pool is None and config.SCAN_CHUNK_WORKERS > 1:
+        _chunk_pool = ProcessPoolExecutor(
+            max_workers=config.SCAN_CHUNK_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _chunk_pool
+
+def shutdown_chunk_pool() -> None:
+    """Stops the chunk scanning pool, if one was started; the next large job starts a new one"""
+    global _chunk_pool
+    if _chunk_pool is not None:
+        _chunk_pool.shutdown(cancel_futures=True)
+        _chunk_pool = None
+
+@celery_app.task(bind=True, name="xss_scanner.scan_job")
+def scan_job(self, code: str) -> Dict[str, Any]:
+    """
+    Scans code as a background job, reporting progress as the share of the scan done.
+
+    Jobs of at least the scanner's parallel_threshold characters are scanned in
+    chunks on the worker's chunk pool.
+
+    Args:
+        code: The HTML/JavaScript code to analyze
+
+    Returns:
+        Scan result dictionary, as returned by XSSScanner.scan_code
+    """
+    job_scanner = get_job_scanner()
+    started = time.perf_counter()
+    executor = get_chunk_pool() if len(code) >= job_scanner.parallel_threshold else None
+
+    summary = {}
+    vulnerabilities = []
+    last_update = started
+
+    def report_progress(share: float) -> None:
+        nonlocal last_update
+        now = time.perf_counter()
+        if now - last_update >= PROGRESS_INTERVAL:
+            last_update = now
+            self.update_state(state="PROGRESS", meta={
+                "progress": min(share, 1.0),
+                "vulnerabilities_found": len(vulnerabilities)
+            })
+
+    findings = job_scanner.iter_findings(code, summary=summary, executor=executor, progress=report_progress)
+    for finding in findings:
+        vulnerabilities.append(finding)
+
+    return {
+        **summary,
+        "vulnerabilities": vulnerabilities,
+        "scan_duration": time.perf_counter() - started,
+        "code_length": len(code)
+    }
@@ -3,10 +3,25 @@
 Comprehensive test suite for XSS Scanner with security and performance tests
 """
 
+import asyncio
+import json
+import os
 import pytest
 import time
-from utils_fixed import scanner
-from models_fixed import XSSScanRequest
+from utils import scanner, cacheable_result, CommentMap, LineIndex, XSSScanner
+from scan_executor import ScanExecutor
+from scan_cache import ScanResultCache, RedisScanCache
+from api_key_cache import APIKeyCache, MISSING
+from database import Database
+from usage import UsageAccumulator
+from rate_limit import RateLimiter, RedisRateLimiter, request_cost
+from tasks import celery_app, scan_job, get_job_scanner
+from models import XSSScanRequest, exceeds_line_length
+import xss_scanner
+from benchmark import generate_corpus, run_benchmark, CORPUS_CLASSES
+from incremental import parse_unified_diff, filter_findings, git_blob_hash
+from metrics import MetricsRegistry, Counter, Gauge, Histogram
+from regex_backends import UNICODE_CLASSES
 
 def test_vulnerable_code():
     """Test the scanner with various vulnerable code snippets"""
@@ -74,7 +89,7 @@ def test_vulnerable_code():
         print(f"Code:\n{test_case['code']}")
         print(f"\nExpected vulnerabilities: {expected}")
         print(f"Found vulnerabilities: {found}")
-        print(f"Scan time: {end_time - start_time".3f"} seconds")
+        print(f"Scan time: {end_time - start_time:.3f} seconds")
 
         if found > 0:
             print("\nVulnerabilities found:")
@@ -99,44 +114,27 @@ def test_vulnerable_code():
     return passed == total
 
 def test_scanner_performance():
-    """Test scanner performance with large code samples"""
+    """Benchmark smoke test: every input class of the benchmark corpus scans within budget"""
     print("\n🕐 Testing Scanner Performance")
     print("=" * 30)
 
-    # Test with large code sample
-    large_code = """
-    <html>
-    <head><title>Test</title></head>
-    <body>
-    <div id="content1">Safe content</div>
-    <div id="content2">Safe content</div>
-    <div id="content3">Safe content</div>
-    <script>
-    // This is safe
-    console.log("safe");
-    document.getElementById("content1").innerHTML = userInput; // Vulnerable
-    document.getElementById("content2").innerHTML = safeInput; // Safe
-    document.getElementById("content3").innerHTML = userInput; // Vulnerable
-    </script>
-    </body>
-    </html>
-    """ * 100  # Repeat 100 times
-
-    start_time = time.time()
-    result = scanner.scan_code(large_code)
-    end_time = time.time()
-
-    print(f"Code size: {len(large_code)} characters")
-    print(f"Vulnerabilities found: {result['vulnerabilities_found']}")
-    print(f"Scan time: {end_time - start_time".3f"} seconds")
-
-    # Performance should be reasonable (under 5 seconds for this size)
-    if end_time - start_time < 5.0:
-        print("✅ Performance test PASSED")
-        return True
-    else:
-        print("❌ Performance test FAILED - too slow")
-        return False
+    corpus = generate_corpus(seed=0, size=20000, count=2)
+    assert generate_corpus(seed=0, size=20000, count=2) == corpus
+    assert set(corpus) == set(CORPUS_CLASSES)
+
+    bench_scanner = XSSScanner()
+    bench_scanner.max_code_length = 20000
+    bench_scanner.time_budget = 5.0
+    results = run_benchmark(corpus, bench_scanner, repeat=1, measure_memory=False)
+
+    for name, stats in results["classes"].items():
+        print(f"{name}: {stats['mb_per_s']:.2f} MB/s, p99 {stats['p99_ms']:.1f} ms, {stats['findings']} findings")
+        assert stats["partial"] == 0
+        assert stats["mb_per_s"] > 0
+    assert results["classes"]["finding_dense"]["findings"] > results["classes"]["comment_dense"]["findings"]
+
+    print("✅ Performance test PASSED")
+    return True
 
 def test_input_validation():
     """Test input validation"""
@@ -199,6 +197,943 @@ def test_regex_accuracy():
 
     return passed == len(test_cases)
 
+def test_document_scan_matches_per_line_scan():
+    """Scanning the whole buffer must report what a line-by-line scan of every rule does"""
+    code = "\n".join([
+        'document.getElementById("content").innerHTML = userInput + req.query.name;',
+        'eval(code); document.write(x); document.writeln(y);',
+        '<a href="javascript:alert(1)" onclick="go()">link</a>\r\nconst a = 1;',
+        'const html = `<p>${userInput}</p>`; el.insertAdjacentHTML("beforeend", html);',
+        'var s = document.createElement("script"); s.setAttribute("src", url);',
+        'console.log("nothing to see here");',
+        '',
+        '<script src="a.js"></script>',
+    ])
+
+    comment_map = CommentMap(code)
+    line_starts = LineIndex(code).starts
+
+    expected = []
+    for line_number, line in enumerate(code.splitlines(), start=1):
+        for name, compiled_pattern in scanner.compiled_patterns.items():
+            for match in compiled_pattern.finditer(line):
+                if not comment_map.is_comment(line_starts[line_number - 1] + match.start()):
+                    expected.append((line_number, name, match.group().strip()))
+
+    result = scanner.scan_code(code)
+    found = [
+        (vuln["line"], vuln["vulnerability_type"], vuln["snippet"])
+        for vuln in result["vulnerabilities"]
+    ]
+    assert found == expected[:len(found)]
+    assert len(found) >= min(len(expected), scanner.max_vulnerabilities)
+
+def test_multiline_script_block():
+    """Script blocks spanning several lines are reported on their opening line"""
+    code = '<div>\n<script>\nrun();\n</script>\n<script src="x.js"></script>'
+    multiline_scanner = XSSScanner()
+    multiline_scanner.max_vulnerabilities = 1000
+    result = multiline_scanner.scan_code(code)
+    script_findings = [
+        (vuln["line"], vuln["snippet"])
+        for vuln in result["vulnerabilities"]
+        if vuln["vulnerability_type"] == "script_tag_injection"
+    ]
+    assert script_findings == [(2, "<script>\nrun();\n</script>"), (5, '<script src="x.js"></script>')]
+
+def test_unclosed_script_tags_scan_in_linear_time():
+    """Script tags without a closing tag do not make the multi-line rule rescan the rest of the document"""
+    for code in ("</script>" + "<script>" * 6000, "</script>\n" + "<script>\n" * 5000):
+        started = time.perf_counter()
+        result = scanner.scan_code(code, time_budget=0, use_cache=False)
+        assert time.perf_counter() - started < 0.5
+        assert result["vulnerabilities_found"] == 0
+
+    result = scanner.scan_code("<script>" * 3000 + "\n<script</script>>x</script>", time_budget=0, use_cache=False)
+    assert [(vuln["line"], vuln["snippet"]) for vuln in result["vulnerabilities"]] == [
+        (2, "<script</script>>x</script>")
+    ]
+
+def test_comment_map_spans():
+    """Comments are found across lines, and comment markers inside strings are ignored"""
+    code = (
+        '#!/usr/bin/env node\n'
+        'a(); // note\n'
+        '/* block\n   still comment */ b();\n'
+        '<!-- html\n -->\n'
+        '  #field = 1;\n'
+        'var u = "http://x/*y"; c = \'#id\'; d = `\n//`; e(); // end'
+    )
+    comment_map = CommentMap(code)
+
+    def commented(text, occurrence=0):
+        offset = -1
+        for _ in range(occurrence + 1):
+            offset = code.index(text, offset + 1)
+        return comment_map.is_comment(offset)
+
+    assert commented("note")
+    assert commented("still comment")
+    assert not commented("b();")
+    assert commented(" -->")
+    assert commented("/usr/bin")
+    assert not commented("#field")
+    assert not commented("http://x")
+    assert comment_map.is_string(code.index("/*y"))
+    assert not commented("#id")
+    assert not commented("//`")
+    assert not commented("e();")
+    assert commented("end")
+
+def test_comments_exclude_findings():
+    """Matches inside comments are skipped, including multi-line and trailing comments"""
+    test_cases = [
+        ('<a href="javascript:go()">x</a>', 1),
+        ('x(); // <a href="javascript:go()">x</a>', 0),
+        ('/*\n<a href="javascript:go()">x</a>\n*/', 0),
+        ('<!--\n<a href="javascript:go()">x</a>\n-->', 0),
+        ('/* note */ <a href="javascript:go()">x</a>', 1),
+        ('<a href="javascript://%0aalert(1)">x</a>', 1),
+    ]
+
+    for code, expected in test_cases:
+        found = [
+            vuln for vuln in scanner.scan_code(code)["vulnerabilities"]
+            if vuln["vulnerability_type"] == "javascript_protocol"
+        ]
+        assert len(found) == expected, f"Unexpected result for: {code!r}"
+
+def test_comment_syntax_scoping():
+    """/* only opens a comment in scripts and styles of HTML documents, and # private fields are code"""
+    html = (
+        '<p>Match every file with /* in the pattern</p>\n'
+        '<a href="javascript:go()">x</a>\n'
+        '<style>/* <a href="javascript:hidden()"> */</style>\n'
+        '<script>\n/* <a href="javascript:hidden()"> */\n</script>\n'
+        '<p>end */</p>'
+    )
+    found = [vuln["snippet"] for vuln in scanner.scan_code(html, use_cache=False)["vulnerabilities"]
+             if vuln["vulnerability_type"] == "javascript_protocol"]
+    assert found == ["javascript:go()"]
+
+    script = (
+        'class Widget {\n'
+        '  #render = () => { this.el.innerHTML = this.input; };\n'
+        '  #unsafe = "<a href=\'javascript:go()\'>x</a>";\n'
+        '}'
+    )
+    found = [vuln["vulnerability_type"] for vuln in scanner.scan_code(script, use_cache=False)["vulnerabilities"]]
+    assert "innerHTML_assignment" in found
+    assert "javascript_protocol" in found
+
+def test_rule_compilation():
+    """Comment guards are stripped and broken rules are reported instead of matching everything"""
+    assert scanner.invalid_patterns == {}
+    assert scanner.compiled_patterns["eval_function_call"].pattern == r"eval\s*\([^)]*\)"
+
+    class BrokenRuleScanner(XSSScanner):
+        def _get_vulnerability_patterns(self):
+            return {
+                "eval_function_call": r"(?<!//.*)eval\s*\([^)]*\)",
+                "broken_rule": r"(?<=a+)b",
+            }
+
+    broken_scanner = BrokenRuleScanner()
+    assert list(broken_scanner.compiled_patterns) == ["eval_function_call"]
+    assert "broken_rule" in broken_scanner.invalid_patterns
+
+    result = broken_scanner.scan_code("var a = 1;\n// eval(x)\neval(y)")
+    assert [(vuln["line"], vuln["snippet"]) for vuln in result["vulnerabilities"]] == [(3, "eval(y)")]
+
+def test_literal_prefilter_candidate_lines():
+    """The prefilter must only select rules on lines that contain their literal"""
+    assert scanner.rule_literals["javascript_protocol"] == "javascript:"
+    assert scanner.rule_literals["script_tag_injection"] == "</script>"
+
+    code = 'const x = 1;\n<a href="JavaScript:go()">x</a>\nlet y = `${x}`;'
+    candidate_lines = scanner._find_candidate_lines(code, LineIndex(code))
+
+    assert list(candidate_lines["javascript_protocol"]) == [2]
+    assert list(candidate_lines["template_literal_injection"]) == [3]
+    assert list(candidate_lines["script_tag_injection"]) == []
+
+def test_rule_precheck_candidate_lines():
+    """Rules with a precheck skip lines that hold their literal but cannot match"""
+    code = (
+        "function onLoad() {\n"             # "on" without an assignment
+        "let data = '{}'; // json\n"        # assignment only before "on"
+        "<button onclick = 'go()'>\n"
+        "button.onclick = \"go()\";\n"
+        "// unrelated = 'x' once more\n"    # "on" only after the assignment
+    )
+    candidate_lines = scanner._find_candidate_lines(code, LineIndex(code))
+    assert list(candidate_lines["on_event_handler"]) == [3, 4]
+
+    unfiltered_scanner = XSSScanner()
+    unfiltered_scanner.rule_prechecks = {}
+    assert scanner.scan_code(code, use_cache=False)["vulnerabilities"] == \
+        unfiltered_scanner.scan_code(code, use_cache=False)["vulnerabilities"]
+
+def test_re2_backend_matches_re():
+    """The RE2 backend must report the same findings, falling back to re per rule"""
+    pytest.importorskip("re2")
+
+    class LookbehindRuleScanner(XSSScanner):
+        def _get_vulnerability_patterns(self):
+            patterns = super()._get_vulnerability_patterns()
+            patterns["lookbehind_rule"] = r"(?<!\.)unsafeHTML\("
+            return patterns
+
+    re_scanner = LookbehindRuleScanner("re")
+    re2_scanner = LookbehindRuleScanner("re2")
+    assert re2_scanner.rule_backends["lookbehind_rule"] == "re"
+    assert re2_scanner.rule_backends["eval_function_call"] == "re2"
+
+    code = (
+        "const a = 1;\n"
+        "el.innerHTML = userInput;\n"
+        "<script>\nalert(1)\n</script>\n"
+        "// eval(x)\n"
+        "unsafeHTML(x); a.unsafeHTML(y)\n"
+        "<a href=\"javascript:go()\" onclick=\"go()\">x</a>"
+    )
+    assert cacheable_result(re2_scanner.scan_code(code)) == cacheable_result(re_scanner.scan_code(code))
+
+def test_re2_backend_unicode_classes():
+    """\\s and \\w match non-ASCII whitespace and letters on RE2 as they do on re"""
+    pytest.importorskip("re2")
+    re_scanner = XSSScanner("re")
+    re2_scanner = XSSScanner("re2")
+
+    code = (
+        "<a onclick =　\"go()\">x</a>\n"
+        "<b onclické=\"go()\">y</b>\n"
+        "el.innerHTML = userInput;\n"
+        "<a href=\"javascript: alert(1)\">z</a>"
+    )
+    result = re2_scanner.scan_code(code, use_cache=False)
+    assert [vuln["snippet"] for vuln in result["vulnerabilities"]] == [
+        "onclick =　\"go()\"", "onclické=\"go()\"",
+        ".innerHTML = userInput", "javascript: alert(1)"
+    ]
+    assert cacheable_result(result) == cacheable_result(re_scanner.scan_code(code, use_cache=False))
+
+    backend = re2_scanner.regex_backend
+    assert backend.unicode_classes(r"[^\s'\]]\w") == "[^" + UNICODE_CLASSES["s"] + r"'\]][" + UNICODE_CLASSES["w"] + "]"
+    with pytest.raises(backend.error):
+        backend.unicode_classes(r"\bon\w+")
+
+def test_time_budget_partial_result():
+    """A scan that runs out of time returns what it found with partial set"""
+    code = "el.innerHTML = userInput;\n" * 200
+
+    result = scanner.scan_code(code, time_budget=1e-9, use_cache=False)
+    assert result["partial"] is True
+    assert result["timed_out_rule"] == "innerHTML_assignment"
+    assert result["vulnerabilities_found"] < scanner.scan_code(code)["vulnerabilities_found"]
+
+    result = scanner.scan_code(code, time_budget=0)
+    assert result["partial"] is False
+    assert result["timed_out_rule"] is None
+
+def test_time_budget_overrun_on_pathological_input():
+    """Pathological input that runs past the budget is reported as partial, even inside one regex search"""
+    re_scanner = XSSScanner(regex_backend="re")
+
+    result = re_scanner.scan_code("</script>\n" + "<script>\n" * 5000, time_budget=1e-4, use_cache=False)
+    assert result["partial"] is True
+    assert result["timed_out_rule"] == "script_tag_injection"
+
+    # A single backtracking search of a few tenths of a second, once the line length cap is off
+    re_scanner.max_line_length = 0
+    result = re_scanner.scan_code(".innerHTML = " + "+" * 3000, time_budget=0.05, use_cache=False)
+    assert result["partial"] is True
+    assert result["timed_out_rule"] == "unescaped_user_input"
+
+def test_max_line_length_bounds_backtracking_rules():
+    """On re, backtracking rules skip over-long lines, so the time budget holds on pathological input"""
+    re_scanner = XSSScanner(regex_backend="re")
+    re_scanner.max_line_length = 2000
+
+    # Five lines of which each took the unbounded rule most of a second
+    code = ("el.innerHTML = " + "a+" * 5000 + "a\n") * 5
+    started = time.perf_counter()
+    result = re_scanner.scan_code(code, time_budget=2.0, use_cache=False)
+    assert time.perf_counter() - started < 1.0
+    assert result["partial"] is False
+    assert {vulnerability["vulnerability_type"] for vulnerability in result["vulnerabilities"]} == {"innerHTML_assignment"}
+
+    # Lines within the cap are scanned by every rule
+    short_line = "el.innerHTML = '<b>' + userInput;\n"
+    result = re_scanner.scan_code(short_line + "x" * 3000, use_cache=False)
+    assert "unescaped_user_input" in {vulnerability["vulnerability_type"] for vulnerability in result["vulnerabilities"]}
+
+    long_line = "el.innerHTML = '<b>' + userInput; " + "x" * 3000
+    result = re_scanner.scan_code(long_line, use_cache=False)
+    assert "unescaped_user_input" not in {vulnerability["vulnerability_type"] for vulnerability in result["vulnerabilities"]}
+    re_scanner.max_line_length = 0
+    result = re_scanner.scan_code(long_line, use_cache=False)
+    assert "unescaped_user_input" in {vulnerability["vulnerability_type"] for vulnerability in result["vulnerabilities"]}
+
+def test_iter_findings_matches_scan_code():
+    """Streamed findings and summary must add up to the scan_code result"""
+    code = "el.innerHTML = userInput;\n// eval(x)\n<script>\neval(y)\n</script>\n" * 30
+    summary = {}
+    findings = list(scanner.iter_findings(code, summary=summary))
+
+    result = scanner.scan_code(code)
+    assert findings == result["vulnerabilities"]
+    assert summary == {key: value for key, value in cacheable_result(result).items() if key != "vulnerabilities"}
+
+def test_chunked_scan_matches_serial_scan():
+    """Scanning a document in chunks on a process pool must find exactly what a serial scan does"""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    block = (
+        "el.innerHTML = userInput;\n"
+        "/* eval(a)\n document.write(b) */\n"
+        "var s = 'http://x'; eval(s)\r\n"
+        "<script>\nlocation.hash\n</script>\n"
+        "const t = `\n${user}`; // .src = 'a'\n"
+        "<a href=\"javascript:run()\" onclick=\"go()\">\n"
+    )
+    code = "".join(f"{block}var line{i} = {i};\n" for i in range(300))
+
+    chunk_scanner = XSSScanner()
+    chunk_scanner.max_code_length = len(code)
+    chunk_scanner.max_vulnerabilities = 10 ** 6
+    chunk_scanner.parallel_threshold = 0
+    chunk_scanner.chunk_size = 997
+    assert len(chunk_scanner._split_chunks(code)) > 10
+
+    with ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for max_vulnerabilities in (10 ** 6, 50):
+            chunk_scanner.max_vulnerabilities = max_vulnerabilities
+            serial = chunk_scanner.scan_code(code, time_budget=0, use_cache=False)
+            chunked = chunk_scanner.scan_code(code, time_budget=0, use_cache=False, executor=pool)
+            assert cacheable_result(chunked) == cacheable_result(serial)
+
+def test_scan_executor_pools():
+    """Small inputs scan on threads, large ones on worker processes, with the same result"""
+    executor = ScanExecutor(thread_workers=2, process_workers=1, process_threshold=100)
+    small = "el.innerHTML = userInput;"
+    large = "const a = 1;\n" * 10 + small
+    assert not executor.uses_process_pool(len(small))
+    assert executor.uses_process_pool(len(large))
+
+    batch = [small, large, "const a = 1;", large + small, small]
+
+    async def run_scans():
+        return await asyncio.gather(executor.scan(small), executor.scan(large), executor.scan_many(batch))
+
+    try:
+        (small_result, *small_times), (large_result, *large_times), batch_results = asyncio.run(run_scans())
+    finally:
+        executor.shutdown()
+
+    assert cacheable_result(small_result) == cacheable_result(scanner.scan_code(small))
+    assert cacheable_result(large_result) == cacheable_result(scanner.scan_code(large))
+    assert all(seconds >= 0 for seconds in small_times + large_times)
+    assert [cacheable_result(result) for result, _, _ in batch_results] == [
+        cacheable_result(scanner.scan_code(code)) for code in batch
+    ]
+
+    async def stream_scan():
+        return [finding async for finding in executor.iter_scan(large * 10)]
+
+    try:
+        assert asyncio.run(stream_scan()) == scanner.scan_code(large * 10)["vulnerabilities"]
+    finally:
+        executor.shutdown()
+
+def test_result_cache():
+    """Repeated scans are served from the cache until the ruleset changes"""
+    cache = ScanResultCache(max_entries=2, ttl=60)
+    cached_scanner = XSSScanner(result_cache=cache)
+    code = "el.innerHTML = userInput;"
+
+    first = cached_scanner.scan_code(code)
+    first["vulnerabilities"].clear()
+    assert cacheable_result(cached_scanner.scan_code(code)) == cacheable_result(scanner.scan_code(code, use_cache=False))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cached_scanner.scan_code("eval(a)")
+    cached_scanner.scan_code("eval(b)")
+    assert cache.stats()["size"] == 2
+    assert cache.get(cached_scanner.cache_key(code)) is None
+
+    class ChangedRuleScanner(XSSScanner):
+        def _get_vulnerability_patterns(self):
+            patterns = super()._get_vulnerability_patterns()
+            patterns["eval_function_call"] = r"eval\("
+            return patterns
+
+    assert ChangedRuleScanner().ruleset_version != cached_scanner.ruleset_version
+    assert XSSScanner().ruleset_version == cached_scanner.ruleset_version
+
+def test_redis_scan_cache():
+    """Results cached in Redis are shared with executors that have not scanned the code"""
+    fakeredis = pytest.importorskip("fakeredis")
+    codes = ["eval(a)", "const a = 1;", "el.innerHTML = userInput;"]
+
+    async def scan_twice():
+        scanner.result_cache.clear()
+        shared_cache = RedisScanCache(fakeredis.aioredis.FakeRedis())
+        executor = ScanExecutor(thread_workers=1, process_workers=0, shared_cache=shared_cache)
+        first = await executor.scan_many(codes)
+        scanner.result_cache.clear()
+        second = await executor.scan_many(codes)
+        executor.shutdown()
+        return first, second, shared_cache.stats()
+
+    first, second, stats = asyncio.run(scan_twice())
+    assert [cacheable_result(result) for result, _, _ in second] == [cacheable_result(result) for result, _, _ in first]
+    assert stats["hits"] == len(codes)
+
+def test_redis_scan_cache_corrupt_entry():
+    """An entry that does not decode is a miss, and the scan stores a good one in its place"""
+    fakeredis = pytest.importorskip("fakeredis")
+    code = "eval(corrupt)"
+    key = scanner.cache_key(code)
+
+    async def scan_with_corrupt_entry():
+        scanner.result_cache.clear()
+        client = fakeredis.aioredis.FakeRedis()
+        shared_cache = RedisScanCache(client)
+        await client.set(shared_cache.prefix + key, RedisScanCache.serialize({"status": "success"})[:-4])
+        assert await shared_cache.get_many([key, "missing"]) == [None, None]
+        assert shared_cache.stats()["errors"] == 1
+
+        executor = ScanExecutor(thread_workers=1, process_workers=0, shared_cache=shared_cache)
+        result, _, _ = await executor.scan(code)
+        executor.shutdown()
+        return result, await shared_cache.get_many([key])
+
+    result, (stored,) = asyncio.run(scan_with_corrupt_entry())
+    assert result["vulnerabilities_found"] == 1
+    assert stored == cacheable_result(result)
+
+def test_cache_key_ignores_line_endings():
+    """Code that only differs in its line endings shares a cache key and a result"""
+    local_scanner = XSSScanner(result_cache=None)
+    lines = ["<script>", "  alert(1)", "</script>", "el.innerHTML = userInput +", "  more;"]
+    variants = [line_ending.join(lines) for line_ending in ("\n", "\r\n", "\r", "\u2028")]
+
+    assert len({local_scanner.cache_key(code) for code in variants}) == 1
+    assert local_scanner.cache_key("a  b") != local_scanner.cache_key("a b")
+    results = [cacheable_result(local_scanner.scan_code(code)) for code in variants]
+    assert results[0]["vulnerabilities"]
+    assert all(result == results[0] for result in results)
+
+def test_api_key_cache():
+    """Valid and invalid key lookups are cached until they expire or are invalidated"""
+    cache = APIKeyCache(ttl=60, negative_ttl=60, max_entries=10)
+    key_document = {"key": "k" * 32, "is_active": True, "user_id": "user-1"}
+
+    assert cache.get("k" * 32) is MISSING
+    cache.set("k" * 32, key_document)
+    cache.set("x" * 32, None)
+    assert cache.get("k" * 32) == key_document
+    assert cache.get("x" * 32) is None
+    assert cache.stats()["hit_ratio"] == 2 / 3
+
+    cache.invalidate_user("user-1")
+    assert cache.get("k" * 32) is MISSING
+    cache.invalidate("x" * 32)
+    assert cache.get("x" * 32) is MISSING
+
+    expiring_cache = APIKeyCache(ttl=60, negative_ttl=0, max_entries=10)
+    expiring_cache.set("x" * 32, None)
+    assert expiring_cache.get("x" * 32) is MISSING
+
+def test_database_queries_do_not_block_event_loop():
+    """A slow key lookup runs on the database thread pool while the loop keeps going"""
+    database = Database("mongodb://localhost:27017", "test")
+
+    class SlowCollection:
+        def find_one(self, query):
+            time.sleep(0.2)
+            return {"key": query["key"], "is_active": True}
+
+    database.api_keys.collection = SlowCollection()
+
+    async def lookup_while_ticking():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        key_document = await database.api_keys.find_active("k" * 32)
+        ticker.cancel()
+        return key_document, ticks
+
+    try:
+        key_document, ticks = asyncio.run(lookup_while_ticking())
+    finally:
+        database.close()
+
+    assert key_document["key"] == "k" * 32
+    assert ticks >= 5
+
+def test_usage_accumulator_flush():
+    """Usage is merged per key, written in one bulk update, and kept when a write fails"""
+    class Repository:
+        def __init__(self):
+            self.writes = []
+            self.fail = False
+
+        async def bulk_update(self, operations):
+            if self.fail:
+                raise ConnectionError("primary unavailable")
+            self.writes.append(operations)
+
+    async def record_and_flush():
+        repository = Repository()
+        accumulator = UsageAccumulator(flush_interval=3600)
+        accumulator.start(repository)
+        accumulator.record("a" * 32, 100)
+        accumulator.record("a" * 32, 50, scans=2)
+        accumulator.record("b" * 32, 10)
+
+        repository.fail = True
+        assert await accumulator.flush() == 0
+        repository.fail = False
+        accumulator.record("b" * 32, 5)
+        await accumulator.stop()
+        return repository.writes
+
+    writes = asyncio.run(record_and_flush())
+    assert len(writes) == 1
+    updates = {operation._filter["key"]: operation._doc["$inc"] for operation in writes[0]}
+    assert updates == {
+        "a" * 32: {"usage_count": 3, "bytes_scanned": 150},
+        "b" * 32: {"usage_count": 2, "bytes_scanned": 15},
+    }
+
+def test_rate_limiter_token_bucket():
+    """Requests draw tokens by size until the bucket is empty, then get a retry delay"""
+    limiter = RateLimiter(per_minute=60, burst=3)
+    assert request_cost(0, bytes_per_token=1000) == 1
+    assert request_cost(2500, bytes_per_token=1000) == 3
+
+    async def spend():
+        decisions = [await limiter.acquire("k" * 32, 1) for _ in range(3)]
+        decisions.append(await limiter.acquire("k" * 32, 1))
+        decisions.append(await limiter.acquire("x" * 32, 100))
+        return decisions
+
+    *allowed, denied, capped = asyncio.run(spend())
+    assert all(decision.allowed for decision in allowed)
+    assert not denied.allowed and 0.9 < denied.retry_after <= 1.0
+    assert capped.allowed and capped.remaining == 0
+
+def test_redis_rate_limiter():
+    """The Redis script enforces the same bucket as the in-process limiter"""
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    limiter = RedisRateLimiter(fakeredis.aioredis.FakeRedis(), per_minute=60, burst=2)
+
+    async def spend():
+        return [await limiter.acquire("k" * 32, 1) for _ in range(3)]
+
+    decisions = asyncio.run(spend())
+    assert [decision.allowed for decision in decisions] == [True, True, False]
+    assert decisions[-1].retry_after > 0
+
+def test_scan_job_task():
+    """The job task returns the scan result with the job scanner's larger limits"""
+    code = "el.innerHTML = userInput;\n" * 80
+    result = scan_job.apply(args=[code]).get()
+
+    job_scanner = get_job_scanner()
+    assert job_scanner.max_vulnerabilities > scanner.max_vulnerabilities
+    assert result["vulnerabilities"] == job_scanner.scan_code(code, use_cache=False)["vulnerabilities"]
+    assert result["vulnerabilities_found"] == 80
+    assert result["code_length"] == len(code)
+
+def test_scan_job_progress(monkeypatch):
+    """Jobs report progress as lines are searched, not only when a finding turns up"""
+    updates = []
+    monkeypatch.setattr("tasks.PROGRESS_INTERVAL", 0)
+    monkeypatch.setattr(scan_job, "update_state", lambda **state: updates.append(state["meta"]))
+
+    result = scan_job.apply(args=["el.innerHTML;\n" * 40 + "eval(x)\n"]).get()
+
+    progress = [update["progress"] for update in updates]
+    assert result["vulnerabilities_found"] == 1
+    assert len(progress) >= 40
+    assert progress == sorted(progress) and progress[-1] == 1.0
+    assert updates[0]["vulnerabilities_found"] == 0
+
+@pytest.fixture
+def api_client():
+    """TestClient of the API with a stand-in key collection accepting two keys"""
+    from fastapi.testclient import TestClient
+    import main
+
+    class KeyCollection:
+        def find_one(self, query):
+            if query["key"] in ("k" * 32, "o" * 32):
+                return {"key": query["key"], "is_active": True, "user_id": query["key"][0]}
+            return None
+
+    database = Database("mongodb://localhost:27017", "test")
+    database.api_keys.collection = KeyCollection()
+    main.app.database = database
+    try:
+        with TestClient(main.app) as client:
+            yield client
+    finally:
+        del main.app.database
+
+def test_scan_job_endpoints(api_client, monkeypatch):
+    """A job is queued, polled to its result, and only visible to the key that created it"""
+    headers = {"X-API-Key": "k" * 32}
+    code = "el.innerHTML = userInput;\n" * 3
+
+    # The memory:// broker has no workers, so jobs are refused unless they run eagerly
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", False)
+    response = api_client.post("/scan/jobs", json={"code": code}, headers=headers)
+    assert response.status_code == 503
+
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    response = api_client.post("/scan/jobs", json={"code": code}, headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] == "pending"
+
+    response = api_client.get(f"/scan/jobs/{job['job_id']}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.json()["progress"] == 1.0
+    assert response.json()["result"]["vulnerabilities_found"] == 3
+
+    response = api_client.get(f"/scan/jobs/{job['job_id']}", headers={"X-API-Key": "o" * 32})
+    assert response.status_code == 404
+    response = api_client.get(f"/scan/jobs/{job['job_id'].split('-')[0]}-{'0' * 32}", headers=headers)
+    assert response.json()["status"] == "pending"
+
+def test_chunk_pool_shutdown(monkeypatch):
+    """The chunk pool of eager jobs is stopped with the API and started again when needed"""
+    import tasks
+
+    monkeypatch.setattr(tasks.config, "SCAN_CHUNK_WORKERS", 2)
+    pool = tasks.get_chunk_pool()
+    assert pool is not None and tasks.get_chunk_pool() is pool
+
+    tasks.shutdown_chunk_pool()
+    assert tasks._chunk_pool is None
+    with pytest.raises(RuntimeError):
+        pool.submit(len, "")
+    tasks.shutdown_chunk_pool()
+
+def test_api_scans_large_inputs_in_chunks(api_client, monkeypatch):
+    """/scan and /scan/batch split inputs above the parallel threshold into chunks, finding what a serial scan does"""
+    chunked_scans = []
+    iter_chunked_matches = XSSScanner._iter_chunked_matches
+
+    def counting_iter_chunked_matches(self, code, *args, **kwargs):
+        chunked_scans.append(len(code))
+        return iter_chunked_matches(self, code, *args, **kwargs)
+
+    monkeypatch.setattr(XSSScanner, "_iter_chunked_matches", counting_iter_chunked_matches)
+    scanner.result_cache.clear()
+    headers = {"X-API-Key": "k" * 32}
+    code = ("var a = 1; // eval(a)\n" * 80 + "el.innerHTML = userInput;\n") * 24
+    assert scanner.parallel_threshold <= len(code) <= scanner.max_code_length
+    def findings(vulnerabilities):
+        return [(vuln["line"], vuln["vulnerability_type"], vuln["snippet"]) for vuln in vulnerabilities]
+
+    expected = findings(scanner.scan_code(code, use_cache=False)["vulnerabilities"])
+
+    response = api_client.post("/scan", json={"code": code}, headers=headers)
+    assert response.status_code == 200
+    assert findings(response.json()["vulnerabilities"]) == expected
+
+    scanner.result_cache.clear()
+    response = api_client.post(
+        "/scan/batch", json={"items": [{"name": "big.js", "code": code}, {"name": "small.js", "code": "eval(x)"}]},
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert findings(response.json()["results"][0]["vulnerabilities"]) == expected
+    assert response.json()["results"][1]["vulnerabilities_found"] == 1
+    assert chunked_scans == [len(code), len(code)]
+
+def test_scan_batch_endpoint(api_client):
+    """/scan/batch returns one result per snippet, in request order, with the total"""
+    items = [{"name": "a.js", "code": "eval(a)"}, {"name": "b.js", "code": "var b = 1;"}, {"name": "c.js", "code": "eval(c); eval(d)"}]
+    response = api_client.post("/scan/batch", json={"items": items}, headers={"X-API-Key": "k" * 32})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["items_scanned"] == 3
+    assert [result["name"] for result in body["results"]] == ["a.js", "b.js", "c.js"]
+    assert [result["vulnerabilities_found"] for result in body["results"]] == [1, 0, 2]
+    assert body["vulnerabilities_found"] == 3
+
+    response = api_client.post("/scan/batch", json={"items": []}, headers={"X-API-Key": "k" * 32})
+    assert response.status_code == 422
+
+def test_rate_limit_response(api_client, monkeypatch):
+    """A key over its limit gets 429 with a Retry-After header; other keys are unaffected"""
+    import main
+    monkeypatch.setattr(main.app, "rate_limiter", RateLimiter(per_minute=1, burst=1), raising=False)
+
+    assert api_client.post("/scan", json={"code": "eval(a)"}, headers={"X-API-Key": "k" * 32}).status_code == 200
+    response = api_client.post("/scan", json={"code": "eval(a)"}, headers={"X-API-Key": "k" * 32})
+    assert response.status_code == 429
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+    assert api_client.post("/scan", json={"code": "eval(a)"}, headers={"X-API-Key": "o" * 32}).status_code == 200
+
+def test_scan_diff_endpoint(api_client):
+    """/scan/diff scans the files in the diff and reports findings on changed lines only"""
+    diff = (
+        "diff --git a/a.js b/a.js\n"
+        "--- a/a.js\n"
+        "+++ b/a.js\n"
+        "@@ -1,3 +1,3 @@\n"
+        " eval(a)\n"
+        " var b = 1;\n"
+        "-var c = 1;\n"
+        "+eval(c)\n"
+    )
+    files = [{"name": "a.js", "code": "eval(a)\nvar b = 1;\neval(c)\n"}, {"name": "b.js", "code": "eval(b)"}]
+    headers = {"X-API-Key": "k" * 32}
+
+    response = api_client.post("/scan/diff", json={"diff": diff, "files": files}, headers=headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["name"] for result in body["results"]] == ["a.js"]
+    assert [vuln["line"] for vuln in body["results"][0]["vulnerabilities"]] == [3]
+
+    response = api_client.post("/scan/diff", json={"diff": diff, "files": files, "context_lines": 2}, headers=headers)
+    assert [vuln["line"] for vuln in response.json()["results"][0]["vulnerabilities"]] == [1, 3]
+
+def test_rule_stats_endpoints(api_client, monkeypatch):
+    """/admin/rule-stats is hidden without ADMIN_API_KEY and needs the key in X-Admin-Key"""
+    import main
+    monkeypatch.setattr(main.config, "ADMIN_API_KEY", None)
+    assert api_client.get("/admin/rule-stats").status_code == 404
+
+    monkeypatch.setattr(main.config, "ADMIN_API_KEY", "a" * 32)
+    assert api_client.get("/admin/rule-stats").status_code == 401
+    assert api_client.get("/admin/rule-stats", headers={"X-Admin-Key": "b" * 32}).status_code == 401
+    assert api_client.get("/admin/rule-stats", headers={"X-API-Key": "k" * 32}).status_code == 401
+
+    headers = {"X-Admin-Key": "a" * 32}
+    was_enabled = scanner.rule_stats is not None
+    try:
+        response = api_client.post("/admin/rule-stats", json={"enabled": True, "reset": True}, headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"enabled": True, "rules": {}}
+        scanner.scan_code("eval(a)", use_cache=False)
+        assert "eval_function_call" in api_client.get("/admin/rule-stats", headers=headers).json()["rules"]
+
+        response = api_client.post("/admin/rule-stats", json={"enabled": False}, headers=headers)
+        assert response.json() == {"enabled": False, "rules": {}}
+    finally:
+        if was_enabled:
+            scanner.enable_instrumentation()
+        else:
+            scanner.disable_instrumentation()
+
+def test_scan_stream_endpoint(api_client):
+    """/scan/stream sends one NDJSON record per finding, in scan order, then a summary"""
+    code = "eval(a)\nvar b = 1;\nel.innerHTML = userInput;"
+    response = api_client.post("/scan/stream", json={"code": code}, headers={"X-API-Key": "k" * 32})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert [record["type"] for record in records] == ["vulnerability"] * (len(records) - 1) + ["summary"]
+    expected = scanner.scan_code(code, use_cache=False)
+    assert [(record["line"], record["vulnerability_type"]) for record in records[:-1]] == [
+        (vuln["line"], vuln["vulnerability_type"]) for vuln in expected["vulnerabilities"]
+    ]
+    assert records[-1]["vulnerabilities_found"] == expected["vulnerabilities_found"]
+    assert records[-1]["partial"] is False
+
+    response = api_client.post("/scan/stream", json={"code": code})
+    assert response.status_code == 401
+
+def test_unknown_regex_backend():
+    """Misspelled backend names are rejected rather than silently ignored"""
+    with pytest.raises(ValueError):
+        XSSScanner("pcre")
+
+def test_missing_regex_backend_fails(monkeypatch):
+    """An explicitly requested engine that is not installed is an error, not a silent downgrade"""
+    import regex_backends
+
+    class MissingBackend(regex_backends.RegexBackend):
+        def __init__(self):
+            raise ImportError("No module named 're2'")
+
+    monkeypatch.setitem(regex_backends.REGEX_BACKENDS, "re2", MissingBackend)
+    with pytest.raises(ImportError, match="google-re2"):
+        XSSScanner("re2")
+
+def test_cli_directory_scan(tmp_path, capsys):
+    """The CLI scans matching files and skips ignored, vendored and minified ones"""
+    (tmp_path / ".gitignore").write_text("build/\n*.gen.js\n")
+    for name, code in {
+        "app.js": "el.innerHTML = userInput;\n",
+        "views/page.vue": "<div onclick=\"go()\"></div>\n",
+        "notes.txt": "eval(x)\n",
+        "build/out.js": "eval(x)\n",
+        "api.gen.js": "eval(x)\n",
+        "node_modules/lib/index.js": "eval(x)\n",
+        "lib.min.js": "eval(x)\n",
+        "bundle.js": "var a = 1; eval(x);" * 100,
+    }.items():
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(code)
+
+    files = xss_scanner.collect_files([str(tmp_path)])
+    assert sorted(os.path.relpath(path, tmp_path) for path in files) == sorted(
+        ["app.js", "bundle.js", os.path.join("views", "page.vue")]
+    )
+
+    assert xss_scanner.main([str(tmp_path), "--format", "json", "--workers", "1", "--no-cache"]) == 1
+    report = json.loads(capsys.readouterr().out)
+    assert report["files_scanned"] == 2
+    assert report["files_skipped"] == 1
+    assert report["vulnerabilities_found"] == 2
+
+    assert xss_scanner.main([str(tmp_path), "--format", "sarif", "--workers", "1", "--no-cache", "--exit-zero"]) == 0
+    sarif = json.loads(capsys.readouterr().out)
+    rule_ids = {result["ruleId"] for result in sarif["runs"][0]["results"]}
+    assert rule_ids == {"innerHTML_assignment", "on_event_handler"}
+
+def test_incremental_diff_scan(tmp_path, monkeypatch, capsys):
+    """Diff mode only reports findings on touched lines and caches results by blob hash"""
+    diff = (
+        "--- a/app.js\n+++ b/app.js\n"
+        "@@ -1,3 +1,4 @@\n el.innerHTML = a;\n-var x = 1;\n+var x = 2; eval(q)\n eval(y)\n+document.write(b)\n"
+        "--- a/gone.js\n+++ /dev/null\n@@ -1 +0,0 @@\n-eval(z)\n"
+    )
+    assert parse_unified_diff(diff) == {"app.js": [2, 4]}
+    assert git_blob_hash(b"eval(x)\n") == "b289c84fb58abfac230dedac6d4be5c541345635"
+
+    code = "el.innerHTML = a;\nvar x = 2; eval(q)\neval(y)\ndocument.write(b)\n"
+    result = scanner.scan_code(code)
+    assert [v["line"] for v in filter_findings(result, [2, 4])["vulnerabilities"]] == [2, 4, 4]
+    assert filter_findings(result, [2, 4], context_lines=1)["vulnerabilities_found"] == result["vulnerabilities_found"]
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "app.js").write_text(code)
+    (tmp_path / "change.diff").write_text(diff)
+    cache_dir = tmp_path / "cache"
+    arguments = ["--diff", "change.diff", "--format", "json", "--workers", "1", "--cache-dir", str(cache_dir)]
+    assert xss_scanner.main(arguments) == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [v["line"] for v in report["results"][0]["vulnerabilities"]] == [2, 4, 4]
+
+    blob_hash = git_blob_hash(code.encode())
+    assert len(list(cache_dir.glob(f"*/{blob_hash[:2]}/{blob_hash[2:]}.json"))) == 1
+    assert xss_scanner.main(arguments) == 1
+    assert json.loads(capsys.readouterr().out) == report
+
+def test_rule_stats():
+    """Instrumented scans count runs, matches and comment-suppressed matches per rule"""
+    instrumented_scanner = XSSScanner()
+    code = "eval(a)\n// eval(b)\n/* document.write(c) */ el.innerHTML = d;\n"
+    instrumented_scanner.scan_code(code, use_cache=False)
+    assert instrumented_scanner.rule_stats is None
+
+    rule_stats = instrumented_scanner.enable_instrumentation()
+    result = instrumented_scanner.scan_code(code, use_cache=False)
+    assert cacheable_result(result) == cacheable_result(scanner.scan_code(code, use_cache=False))
+    stats = rule_stats.snapshot()
+    assert stats["eval_function_call"]["invocations"] == 1
+    assert stats["eval_function_call"]["matches"] == 2
+    assert stats["eval_function_call"]["suppressed"] == 1
+    assert stats["document_write_call"]["suppressed"] == stats["document_write_call"]["matches"] == 1
+    assert stats["innerHTML_assignment"]["suppressed"] == 0
+    assert all(rule["seconds"] >= 0 for rule in stats.values())
+
+    instrumented_scanner.scan_code(code, use_cache=False)
+    assert rule_stats.snapshot()["eval_function_call"]["matches"] == 4
+    rule_stats.reset()
+    assert rule_stats.snapshot() == {}
+    instrumented_scanner.disable_instrumentation()
+    assert instrumented_scanner.rule_stats is None
+
+def test_scan_request_validation():
+    """Requests are rejected for blank code or overlong lines, and scanned whatever they contain"""
+    assert XSSScanRequest(code="<script>alert(1)</script>\neval(alert)").code.startswith("<script>")
+    assert XSSScanRequest(code="a" * 10000 + "\n" + "b" * 10000)
+    for code in (" \n\t", "a" * 10001, "short\n" + "a" * 10001 + "\nshort"):
+        with pytest.raises(ValueError):
+            XSSScanRequest(code=code)
+
+    assert not exceeds_line_length("ab\ncd\n", 2)
+    assert exceeds_line_length("ab\ncde", 2)
+    assert exceeds_line_length("abc\n", 2)
+    assert not exceeds_line_length("", 2)
+
+def test_scan_timings():
+    """scan_code reports its duration, the code length and, when asked, its phase timings"""
+    cached_scanner = XSSScanner(result_cache=ScanResultCache())
+    code = "eval(a)\n// eval(b)\n"
+    result = cached_scanner.scan_code(code, timings=True)
+    assert result["code_length"] == len(code)
+    assert result["scan_duration"] > 0
+    assert set(result["timings"]) == {"prefilter", "regex_matching", "comment_filtering"}
+    assert result["timings"]["comment_filtering"] > 0
+
+    cached = cached_scanner.result_cache.get(cached_scanner.cache_key(code))
+    assert not set(cached) & {"scan_duration", "code_length", "timings"}
+    assert "timings" not in cached_scanner.scan_code(code)
+
+def test_metrics_exposition():
+    """Metrics render in the Prometheus text format with cumulative histogram buckets"""
+    registry = MetricsRegistry()
+    requests = registry.register(Counter("requests_total", "Requests", ("route",)))
+    in_flight = registry.register(Gauge("in_flight", "In flight"))
+    latency = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    registry.collector(lambda: in_flight.set(3))
+
+    requests.labels('/scan "x"').inc()
+    requests.labels('/scan "x"').inc(2)
+    for value in (0.05, 0.1, 0.5, 7.0):
+        latency.observe(value)
+    lines = registry.render().splitlines()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/scan \\"x\\""} 3' in lines
+    assert "in_flight 3" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    sum_line, = [line for line in lines if line.startswith("latency_seconds_sum ")]
+    assert float(sum_line.split()[1]) == pytest.approx(7.65)
+    assert "latency_seconds_count 4" in lines
+
+    executor = ScanExecutor(thread_workers=2, process_workers=0)
+    executor.tasks["thread"] = 5
+    assert executor.queue_depth("thread") == 3
+
+def test_request_metrics_labels(api_client):
+    """Requests are labelled by route template, and unknown methods share one label"""
+    api_client.request("FOOBAR", "/scan")
+    api_client.get("/scan/jobs/some-job", headers={"X-API-Key": "k" * 32})
+    rendered = api_client.get("/metrics").text
+
+    assert 'method="FOOBAR"' not in rendered
+    assert any(
+        line.startswith('xss_scanner_request_duration_seconds_count{method="other",')
+        for line in rendered.splitlines()
+    )
+    assert 'route="/scan/jobs/{job_id}"' in rendered
+    assert "some-job" not in rendered
+
 def run_all_tests():
     """Run all test suites"""
     print("🚀 Running Comprehensive XSS Scanner Tests")
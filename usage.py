@@ -0,0 +1,114 @@
+"""
+Write-behind API key usage accounting
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from pymongo import UpdateOne
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+class UsageAccumulator:
+    """
+    Counts scans, bytes scanned and last use per API key in memory, and
+    periodically writes them to MongoDB with one unordered bulk_write of $inc
+    updates, so the request path never waits on a usage write.
+
+    Counts from a failed flush are merged back and retried on the next one.
+    """
+
+    def __init__(self, flush_interval: float = config.USAGE_FLUSH_INTERVAL):
+        self.flush_interval = flush_interval
+        self.repository = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, api_key: str, bytes_scanned: int, scans: int = 1) -> None:
+        """
+        Adds usage for a key. Must be called from the event loop thread.
+
+        Args:
+            api_key: The API key that was used
+            bytes_scanned: UTF-8 size of the scanned code
+            scans: Number of scans performed
+        """
+        usage = self._pending.get(api_key)
+        if usage is None:
+            usage = self._pending[api_key] = {"scans": 0, "bytes_scanned": 0, "last_used": None}
+        usage["scans"] += scans
+        usage["bytes_scanned"] += bytes_scanned
+        usage["last_used"] = datetime.now(timezone.utc).isoformat()
+
+    def _build_updates(self, pending: Dict[str, Dict[str, Any]]) -> List[UpdateOne]:
+        return [
+            UpdateOne(
+                {"key": api_key},
+                {
+                    "$inc": {"usage_count": usage["scans"], "bytes_scanned": usage["bytes_scanned"]},
+                    "$max": {"last_used": usage["last_used"]}
+                }
+            )
+            for api_key, usage in pending.items()
+        ]
+
+    def _merge_back(self, pending: Dict[str, Dict[str, Any]]) -> None:
+        for api_key, usage in pending.items():
+            current = self._pending.get(api_key)
+            if current is None:
+                self._pending[api_key] = usage
+                continue
+            current["scans"] += usage["scans"]
+            current["bytes_scanned"] += usage["bytes_scanned"]
+            current["last_used"] = max(current["last_used"], usage["last_used"])
+
+    async def flush(self) -> int:
+        """
+        Writes the accumulated usage to the database.
+
+        Returns:
+            Number of keys written
+        """
+        if not self._pending or self.repository is None:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        try:
+            await self.repository.bulk_update(self._build_updates(pending))
+        except Exception as e:
+            logger.error(f"Usage flush failed, keeping counts for retry: {e}")
+            self._merge_back(pending)
+            return 0
+        return len(pending)
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self, repository: Any) -> None:
+        """
+        Starts periodic flushing to a repository with an async bulk_update(operations).
+
+        Args:
+            repository: The API key repository
+        """
+        self.repository = repository
+        self._task = asyncio.create_task(self._flush_periodically())
+
+    async def stop(self) -> None:
+        """Stops periodic flushing and writes what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+# Global usage accumulator instance
+usage_accumulator = UsageAccumulator()
@@ -2,20 +2,354 @@
 Utility functions for XSS Scanner API
 """
 import re
+import time
+import hashlib
 import logging
-from typing import Dict, List, Any, Tuple
+import threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Any, Tuple, Optional, Set, Iterator, Iterable
 from functools import lru_cache
+from heapq import merge
+from operator import itemgetter
+
+from config import config
+from regex_backends import get_regex_backend
+from scan_cache import ScanResultCache
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse
 
 logger = logging.getLogger(__name__)
 
+# Line boundaries recognised by str.splitlines()
+LINE_BREAK_CHARS = "\n\r\v\f\x1c\x1d\x1e\x85\u2028\u2029"
+LINE_BREAK_PATTERN = re.compile(f"\r\n|[{LINE_BREAK_CHARS}]")
+LINE_BREAKS = ("\r\n",) + tuple(LINE_BREAK_CHARS.replace("\n", ""))
+
+# Tokens that open a comment or a string literal. "#" only starts a comment as the
+# hashbang line of a script; elsewhere it is a private field, a selector or a fragment.
+COMMENT_TOKEN_PATTERN = re.compile(r"//|/\*|<!--|[\"'`]|\A#!")
+
+# A document that starts with a tag is HTML, where /* */ comments only exist inside
+# <script> and <style> elements
+MARKUP_START_PATTERN = re.compile(r"\s*<[a-z!?/]", re.IGNORECASE)
+CODE_ELEMENT_PATTERN = re.compile(r"<(script|style)\b", re.IGNORECASE)
+CODE_ELEMENT_END_PATTERNS = {
+    "script": re.compile(r"</script\b", re.IGNORECASE),
+    "style": re.compile(r"</style\b", re.IGNORECASE),
+}
+
+# What ends a string literal opened by each quote; only template literals span lines
+STRING_END_PATTERNS = {
+    "'": re.compile(f"['\\\\{LINE_BREAK_CHARS}]"),
+    '"': re.compile(f'["\\\\{LINE_BREAK_CHARS}]'),
+    "`": re.compile(r"[`\\]"),
+}
+
+# Rule prefix meaning "not inside a // comment". Python's re rejects it as a
+# variable-width lookbehind, so it is stripped at compile time and enforced by
+# the CommentMap check that every match goes through.
+COMMENT_GUARD_PREFIX = "(?<!//.*)"
+
+# Flags every rule is compiled with
+PATTERN_FLAGS = re.IGNORECASE | re.DOTALL
+
+# Characters that re.IGNORECASE matches against ASCII letters but str.lower() does not
+# map one-to-one; folding them first keeps offsets aligned with the original text
+CASE_FOLD_FIXUPS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s"})
+
+def fold_case(code: str) -> str:
+    """Lowercases code for literal searches that agree with re.IGNORECASE, keeping offsets aligned"""
+    if code.isascii():
+        return code.lower()
+    return code.translate(CASE_FOLD_FIXUPS).lower()
+
+def normalize_line_breaks(code: str) -> str:
+    """Replaces every line break with "\\n"; code that only uses "\\n" is returned as is"""
+    for line_break in LINE_BREAKS:
+        if line_break in code:
+            code = code.replace(line_break, "\n")
+    return code
+
+class ScanTimeoutError(Exception):
+    """
+    Raised when a scan runs past its time budget.
+
+    Attributes:
+        rule: Name of the rule that was running, if any
+    """
+
+    def __init__(self, rule: Optional[str] = None):
+        super().__init__("Scan time budget exceeded")
+        self.rule = rule
+
+def check_deadline(deadline: Optional[float]) -> None:
+    """Raises ScanTimeoutError once the deadline (a time.perf_counter() value) has passed"""
+    if deadline is not None and time.perf_counter() > deadline:
+        raise ScanTimeoutError()
+
+class RuleStats:
+    """
+    Cumulative per-rule counters of an instrumented scanner.
+
+    For each rule: seconds spent in it, invocations (runs over a document or
+    chunk), regex matches, and matches suppressed because they were inside a
+    comment. Each scan counts into a table of its own, which is merged in under
+    a lock once the scan ends, so concurrent scans do not contend per match.
+    """
+
+    FIELDS = ("seconds", "invocations", "matches", "suppressed")
+
+    def __init__(self):
+        self._rules: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def new_table() -> Dict[str, List[float]]:
+        """Returns an empty per-scan table for merge()"""
+        return {}
+
+    def merge(self, table: Dict[str, List[float]]) -> None:
+        """Adds a per-scan table of [seconds, invocations, matches, suppressed] by rule"""
+        with self._lock:
+            for name, counters in table.items():
+                totals = self._rules.setdefault(name, [0.0, 0, 0, 0])
+                for position, value in enumerate(counters):
+                    totals[position] += value
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Returns the counters by rule, slowest rule first"""
+        with self._lock:
+            rules = sorted(self._rules.items(), key=lambda item: item[1][0], reverse=True)
+            return {name: dict(zip(self.FIELDS, counters)) for name, counters in rules}
+
+    def reset(self) -> None:
+        """Clears every counter"""
+        with self._lock:
+            self._rules.clear()
+
+    def take(self) -> Dict[str, List[float]]:
+        """Returns the counters as a table for merge() and clears them"""
+        with self._lock:
+            table, self._rules = self._rules, {}
+            return table
+
+def _rule_counters(table: Dict[str, List[float]], name: str) -> List[float]:
+    counters = table.get(name)
+    if counters is None:
+        counters = table[name] = [0.0, 0, 0, 0]
+    return counters
+
+def copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copies a scan result down to its vulnerability dictionaries"""
+    return {**result, "vulnerabilities": [dict(vulnerability) for vulnerability in result["vulnerabilities"]]}
+
+# Result fields describing one scan call rather than the code, left out of cached results
+SCAN_DETAIL_FIELDS = ("scan_duration", "code_length", "timings")
+
+def cacheable_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Returns a scan result without its SCAN_DETAIL_FIELDS"""
+    return {key: value for key, value in result.items() if key not in SCAN_DETAIL_FIELDS}
+
+class LineIndex:
+    """
+    Maps offsets in a document to line numbers without splitting it into lines.
+
+    Line boundaries are the ones str.splitlines() uses, so line numbers agree with
+    a line-by-line scan of the same document.
+    """
+
+    def __init__(self, code: str):
+        self.starts = [0]
+        self.ends = []
+        for match in LINE_BREAK_PATTERN.finditer(code):
+            self.ends.append(match.start())
+            self.starts.append(match.end())
+        self.ends.append(len(code))
+
+        # Like splitlines(), a trailing line break does not open another line
+        if self.starts[-1] == len(code):
+            self.starts.pop()
+            self.ends.pop()
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def line_number(self, offset: int) -> int:
+        """Returns the 1-based number of the line containing the offset"""
+        return bisect_right(self.starts, offset)
+
+class CommentMap:
+    """
+    Spans of comments and string literals in a document, found in one lexing pass.
+
+    Recognises //, /* */ and <!-- --> comments and a leading #! line. In a document
+    that starts with a tag, /* */ comments are only recognised inside <script> and
+    <style> elements, so a stray "/*" in HTML text does not hide what follows.
+    String literals are lexed so that comment markers inside them (such as
+    "http://...") are ignored. The document is only lexed on the first lookup.
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.comment_starts = None
+        self.comment_ends = None
+        self.string_starts = None
+        self.string_ends = None
+
+    def _lex(self) -> None:
+        """Records comment and string spans in document order"""
+        code = self.code
+        code_length = len(code)
+        self.comment_starts, self.comment_ends = [], []
+        self.string_starts, self.string_ends = [], []
+
+        code_elements = self._code_elements() if MARKUP_START_PATTERN.match(code) else None
+
+        position = 0
+        while True:
+            token = COMMENT_TOKEN_PATTERN.search(code, position)
+            if token is None:
+                break
+            start, text = token.start(), token.group()
+
+            if text in STRING_END_PATTERNS:
+                end_pattern = STRING_END_PATTERNS[text]
+                end = token.end()
+                while True:
+                    string_end = end_pattern.search(code, end)
+                    if string_end is None:
+                        end = code_length
+                        break
+                    if string_end.group() == "\\":
+                        end = string_end.end() + 1
+                        continue
+                    # An unterminated quote stops at the end of its line
+                    end = string_end.end() if string_end.group() == text else string_end.start()
+                    break
+                self.string_starts.append(start)
+                self.string_ends.append(min(end, code_length))
+                position = max(end, token.end())
+                continue
+
+            if text == "/*" and code_elements is not None and not self._contains(*code_elements, start):
+                # Text of an HTML document rather than a comment
+                position = token.end()
+                continue
+            if text == "/*" or text == "<!--":
+                closing = "*/" if text == "/*" else "-->"
+                end = code.find(closing, token.end())
+                end = code_length if end == -1 else end + len(closing)
+            elif text == "//" and start > 0 and code[start - 1] == ":":
+                # URL scheme such as http:// rather than a comment
+                position = token.end()
+                continue
+            else:
+                # // and #! comments run to the end of the line
+                line_break = LINE_BREAK_PATTERN.search(code, token.end())
+                end = code_length if line_break is None else line_break.start()
+
+            self.comment_starts.append(start)
+            self.comment_ends.append(end)
+            position = end
+
+    def _code_elements(self) -> Tuple[List[int], List[int]]:
+        """Returns the spans of the contents of <script> and <style> elements"""
+        code = self.code
+        starts, ends = [], []
+        position = 0
+        while True:
+            opening = CODE_ELEMENT_PATTERN.search(code, position)
+            if opening is None:
+                break
+            tag_end = code.find(">", opening.end())
+            if tag_end == -1:
+                break
+            closing = CODE_ELEMENT_END_PATTERNS[opening.group(1).lower()].search(code, tag_end + 1)
+            starts.append(tag_end + 1)
+            if closing is None:
+                ends.append(len(code))
+                break
+            ends.append(closing.start())
+            position = closing.end()
+        return starts, ends
+
+    def _contains(self, starts: List[int], ends: List[int], offset: int) -> bool:
+        """Interval lookup over sorted, non-overlapping spans"""
+        index = bisect_right(starts, offset) - 1
+        return index >= 0 and offset < ends[index]
+
+    def is_comment(self, offset: int) -> bool:
+        """Returns True if the offset lies inside a comment"""
+        if self.comment_starts is None:
+            self._lex()
+        return self._contains(self.comment_starts, self.comment_ends, offset)
+
+    def is_string(self, offset: int) -> bool:
+        """Returns True if the offset lies inside a string literal"""
+        if self.string_starts is None:
+            self._lex()
+        return self._contains(self.string_starts, self.string_ends, offset)
+
+class TimedCommentMap(CommentMap):
+    """CommentMap that adds the time spent in is_comment(), lexing included, to timings["comment_filtering"]"""
+
+    def __init__(self, code: str, timings: Dict[str, float]):
+        super().__init__(code)
+        self.timings = timings
+        timings.setdefault("comment_filtering", 0.0)
+
+    def is_comment(self, offset: int) -> bool:
+        started = time.perf_counter()
+        try:
+            return super().is_comment(offset)
+        finally:
+            self.timings["comment_filtering"] += time.perf_counter() - started
+
 class XSSScanner:
     """XSS vulnerability scanner class with performance optimizations"""
 
-    def __init__(self):
+    def __init__(self, regex_backend: Optional[str] = None, result_cache: Optional[ScanResultCache] = None):
+        self.regex_backend = get_regex_backend(regex_backend or config.REGEX_BACKEND)
         self.vulnerability_patterns = self._get_vulnerability_patterns()
+        self.invalid_patterns = {}
+        self.rule_backends = {}
         self.compiled_patterns = self._compile_patterns()
+        self.multiline_rules = self._get_multiline_rules()
+        self.backtracking_rules = self._get_backtracking_rules()
+        self.rule_literals = {
+            name: self._extract_required_literal(compiled_pattern.pattern)
+            for name, compiled_pattern in self.compiled_patterns.items()
+        }
+        self.literal_index = self._build_literal_index()
+        self.rule_prechecks = {
+            name: re.compile(precheck, PATTERN_FLAGS)
+            for name, precheck in self._get_rule_prechecks().items()
+            if self.rule_literals.get(name) is not None
+        }
+        self.max_lookbehind = self._get_max_lookbehind()
         self.max_code_length = 50000  # Limit code size for performance
         self.max_vulnerabilities = 50  # Limit results to prevent excessive output
+        self.time_budget = config.SCAN_TIME_BUDGET  # Seconds per scan, 0 for no limit
+        self.max_line_length = config.SCAN_MAX_LINE_LENGTH  # For backtracking rules on re, 0 for no limit
+        self.parallel_threshold = config.SCAN_PARALLEL_THRESHOLD  # Characters before chunking
+        self.chunk_size = config.SCAN_CHUNK_SIZE
+        self.result_cache = result_cache
+        self.ruleset_version = self._get_ruleset_version()
+        self.rule_stats: Optional[RuleStats] = RuleStats() if config.SCAN_INSTRUMENTATION else None
+
+    def enable_instrumentation(self) -> RuleStats:
+        """Starts recording per-rule counters in rule_stats, keeping any recorded before"""
+        if self.rule_stats is None:
+            self.rule_stats = RuleStats()
+        return self.rule_stats
+
+    def disable_instrumentation(self) -> None:
+        """Stops recording per-rule counters and drops them"""
+        self.rule_stats = None
 
     def _get_vulnerability_patterns(self) -> Dict[str, str]:
         """
@@ -45,89 +379,759 @@ class XSSScanner:
             "dangerous_writeln": r"(?<!//.*)\.writeln\s*\([^)]*\)",
         }
 
+    def _get_multiline_rules(self) -> Dict[str, Tuple[str, str, str]]:
+        """
+        Returns the rules whose matches may span several lines, with the literals bounding a match.
+
+        All other rules are confined to a single line, exactly as if every line
+        were scanned on its own. A multi-line rule matches from its opening
+        literal, through the first tag end after it, up to the first closing
+        literal after that; these bounds let each search run over just the text
+        a match can cover, see _iter_delimited_matches.
+
+        Returns:
+            Dictionary mapping rule names to (opening, tag_end, closing) lowercase literals
+        """
+        return {"script_tag_injection": ("<script", ">", "</script>")}
+
+    def _get_backtracking_rules(self) -> Set[str]:
+        """
+        Returns the single-line rules whose re search time grows faster than the line length.
+
+        unescaped_user_input retries its trailing .* alternatives after every +,
+        on_event_handler rescans the word after every "on", and
+        template_literal_injection rescans the line after every backtick. On one
+        10,000-character line each takes from 0.1 to over 1.5 seconds, which the
+        time budget cannot interrupt, so on re they skip lines longer than
+        max_line_length, see _iter_line_matches.
+
+        Returns:
+            Set of rule names
+        """
+        return {"unescaped_user_input", "on_event_handler", "template_literal_injection"}
+
     @lru_cache(maxsize=1)
     def _compile_patterns(self) -> Dict[str, Any]:
         """
         Pre-compile regex patterns for better performance with caching.
 
+        The comment guard prefix is removed before compiling, since comment exclusion
+        is applied to every match through the comment map. Rules the configured
+        backend cannot express are compiled with re instead; rules that still fail
+        to compile are left out and recorded in invalid_patterns.
+
         Returns:
             Dictionary of compiled regex patterns
         """
         compiled = {}
         for name, pattern in self.vulnerability_patterns.items():
+            if pattern.startswith(COMMENT_GUARD_PREFIX):
+                pattern = pattern[len(COMMENT_GUARD_PREFIX):]
+
+            if self.regex_backend.name != "re":
+                try:
+                    compiled[name] = self.regex_backend.compile(pattern, PATTERN_FLAGS)
+                    self.rule_backends[name] = self.regex_backend.name
+                    continue
+                except self.regex_backend.error as e:
+                    logger.warning(f"Rule '{name}' not supported by {self.regex_backend.name}, using re: {e}")
+
             try:
-                compiled[name] = re.compile(pattern, re.IGNORECASE | re.DOTALL)
+                compiled[name] = re.compile(pattern, PATTERN_FLAGS)
+                self.rule_backends[name] = "re"
             except re.error as e:
-                logger.error(f"Invalid regex pattern '{name}': {e}")
-                # Fallback to a simpler pattern
-                compiled[name] = re.compile(r".*", re.IGNORECASE | re.DOTALL)
+                logger.error(f"Invalid regex pattern '{name}' disabled: {e}")
+                self.invalid_patterns[name] = str(e)
         return compiled
 
-    def _is_commented_line(self, line: str, match_position: int) -> bool:
+    def _extract_required_literal(self, pattern: str) -> Optional[str]:
         """
-        Checks if a potential vulnerability match is inside a comment.
+        Finds the longest literal that every match of a rule has to contain.
+
+        Only literals at the top level of the pattern are considered, since anything
+        inside a group, repeat or alternation is not guaranteed to appear.
 
         Args:
-            line: The line of code being analyzed
-            match_position: The position where the match was found
+            pattern: The rule's regex pattern
 
         Returns:
-            True if the match appears to be in a comment, False otherwise
+            The lowercased literal, or None if the rule has no usable literal
         """
-        # Check for common comment patterns before the match position
-        comment_patterns = [
-            r"^\s*//",      # Single line comment (//)
-            r"^\s*#",       # Python-style comment (#)
-            r"/\*.*\*/",    # Multi-line comment (/* */)
-            r"<!--.*-->",   # HTML comment
+        try:
+            parsed_pattern = sre_parse.parse(pattern, PATTERN_FLAGS)
+        except re.error:
+            return None
+
+        literals = []
+        current_literal = []
+        for opcode, argument in parsed_pattern:
+            if opcode is sre_parse.LITERAL:
+                current_literal.append(chr(argument))
+                continue
+            if current_literal:
+                literals.append("".join(current_literal))
+                current_literal = []
+        if current_literal:
+            literals.append("".join(current_literal))
+
+        # Hits are mapped to single lines, so literals must not contain line breaks
+        usable_literals = [
+            literal.lower() for literal in literals
+            if literal.isascii() and not LINE_BREAK_PATTERN.search(literal)
         ]
+        return max(usable_literals, key=len, default=None)
+
+    def _get_max_lookbehind(self) -> int:
+        """
+        Returns how far before the start of a line a rule's lookbehind can look.
+
+        Lines are searched in place, so a lookbehind at the start of a line sees the
+        end of the previous one. A chunk of the document must carry this many
+        characters from before its first line to be scanned exactly as in place.
+
+        Returns:
+            Largest lookbehind width in characters, 0 if no rule has one
+        """
+        def lookbehind_width(value: Any) -> int:
+            width = 0
+            if isinstance(value, sre_parse.SubPattern):
+                for opcode, argument in value:
+                    if opcode in (sre_parse.ASSERT, sre_parse.ASSERT_NOT) and argument[0] < 0:
+                        width = max(width, argument[1].getwidth()[1] + lookbehind_width(argument[1]))
+                    else:
+                        width = max(width, lookbehind_width(argument))
+            elif isinstance(value, (list, tuple)):
+                for item in value:
+                    width = max(width, lookbehind_width(item))
+            return width
 
-        # Look at the text before the match
-        text_before_match = line[:match_position]
+        max_width = 0
+        for compiled_pattern in self.compiled_patterns.values():
+            try:
+                parsed_pattern = sre_parse.parse(compiled_pattern.pattern, PATTERN_FLAGS)
+            except re.error:
+                continue
+            max_width = max(max_width, lookbehind_width(parsed_pattern))
+        return max_width
+
+    def _build_literal_index(self) -> Dict[str, List[str]]:
+        """
+        Groups rules by their required literal, so each literal is searched for once.
 
-        for pattern in comment_patterns:
-            if re.search(pattern, text_before_match, re.DOTALL):
-                return True
+        Returns:
+            Dictionary mapping literals to the names of the rules that require them
+        """
+        literal_index = {}
+        for name, literal in self.rule_literals.items():
+            if literal is not None:
+                literal_index.setdefault(literal, []).append(name)
+        return literal_index
+
+    def _get_rule_prechecks(self) -> Dict[str, str]:
+        """
+        Returns patterns that every match of a rule contains after its required literal.
 
-        return False
+        Some literals are too common to select lines on their own: "on" occurs in
+        most lines of ordinary code, while on_event_handler also needs an "="
+        followed by a quote. The prefilter searches the rest of a literal hit's
+        line for the precheck, which starts with a literal of its own and so
+        costs about as much as a substring search.
 
-    def _scan_line_for_vulnerabilities(
+        Returns:
+            Dictionary mapping rule names to precheck patterns
+        """
+        return {"on_event_handler": r"=\s*['\"]"}
+
+    def _find_candidate_lines(
         self,
-        line: str,
-        line_number: int
-    ) -> List[Dict[str, Any]]:
+        code: str,
+        line_index: LineIndex,
+        rule_names: Optional[Iterable[str]] = None
+    ) -> Dict[str, Any]:
         """
-        Scans a single line of code for XSS vulnerabilities using compiled patterns.
+        Runs the literal prefilter over the whole document.
+
+        Every required literal is located with str.find() on a single case-folded copy
+        of the code, which CPython runs as a fast substring search. Only the first hit
+        per line matters, so each search skips ahead to the next line after a hit.
+        Rules with a precheck only keep the lines where it matches between the
+        first hit and the end of the line, see _get_rule_prechecks.
 
         Args:
-            line: The line of code to scan
-            line_number: The line number in the original code
+            code: The code being scanned
+            line_index: Line index of the code
+            rule_names: Rules to find candidate lines for, defaults to every rule
 
         Returns:
-            List of found vulnerabilities in this line
+            Dictionary mapping rule names to the ascending line numbers they can match on
         """
-        found_vulnerabilities = []
+        rule_names = set(self.compiled_patterns if rule_names is None else rule_names)
+        folded_code = fold_case(code)
 
-        for vulnerability_name, compiled_pattern in self.compiled_patterns.items():
-            try:
-                # Find all matches of this pattern in the line
-                matches = compiled_pattern.finditer(line)
+        line_count = len(line_index)
+        candidate_lines = {
+            name: range(1, line_count + 1)
+            for name, literal in self.rule_literals.items()
+            if literal is None and name in rule_names
+        }
+        for literal, literal_rules in self.literal_index.items():
+            literal_rules = [name for name in literal_rules if name in rule_names]
+            if not literal_rules:
+                continue
+            lines = []
+            positions = []
+            position = folded_code.find(literal)
+            while position != -1:
+                line_number = line_index.line_number(position)
+                lines.append(line_number)
+                positions.append(position)
+                if line_number >= line_count:
+                    break
+                position = folded_code.find(literal, line_index.starts[line_number])
+            for name in literal_rules:
+                precheck = self.rule_prechecks.get(name)
+                if precheck is None:
+                    candidate_lines[name] = lines
+                    continue
+                # Later hits on the line end later, so the first one sees every precheck match
+                candidate_lines[name] = [
+                    line_number for line_number, position in zip(lines, positions)
+                    if precheck.search(folded_code, position + len(literal), line_index.ends[line_number - 1])
+                ]
+        return candidate_lines
 
-                for match in matches:
-                    # Skip if this match appears to be in a comment
-                    if not self._is_commented_line(line, match.start()):
-                        found_vulnerabilities.append({
-                            "line": line_number,
-                            "vulnerability_type": vulnerability_name,
-                            "snippet": match.group().strip(),
-                            "confidence": "medium",
-                            "description": self._get_vulnerability_description(vulnerability_name)
-                        })
-            except Exception as e:
-                logger.warning(f"Error scanning line {line_number} for {vulnerability_name}: {e}")
+    def _iter_line_matches(
+        self,
+        code: str,
+        line_index: LineIndex,
+        compiled_pattern: Any,
+        candidate_lines: Any,
+        deadline: Optional[float] = None,
+        max_line_length: int = 0
+    ):
+        """
+        Yields the matches of a rule that fit on a single line.
+
+        Each candidate line is searched in place with pos/endpos set to its bounds,
+        which gives the same matches as scanning the line on its own without copying
+        it out of the document. Bounding the search also stops greedy DOTALL
+        patterns from running on to the end of the buffer.
+
+        Args:
+            code: The code being scanned
+            line_index: Line index of the code
+            compiled_pattern: The rule's compiled pattern
+            candidate_lines: Ascending line numbers the rule can match on
+            deadline: time.perf_counter() value to stop at, checked before each line
+                and after the last one
+            max_line_length: Longer lines are skipped, 0 to search every line
+
+        Yields:
+            Tuples of (line_number, match)
+        """
+        line_starts, line_ends = line_index.starts, line_index.ends
+        skipped_lines = 0
+        for line_number in candidate_lines:
+            check_deadline(deadline)
+            line_start, line_end = line_starts[line_number - 1], line_ends[line_number - 1]
+            if max_line_length and line_end - line_start > max_line_length:
+                skipped_lines += 1
                 continue
+            for match in compiled_pattern.finditer(code, line_start, line_end):
+                yield line_number, match
+        if skipped_lines:
+            logger.info(f"Skipped {skipped_lines} lines longer than {max_line_length} characters for a backtracking rule")
+        # A single search cannot be interrupted, but one that ran past the deadline
+        # still makes the scan partial
+        check_deadline(deadline)
 
-        return found_vulnerabilities
+    def _iter_delimited_matches(
+        self,
+        code: str,
+        folded_code: str,
+        compiled_pattern: Any,
+        delimiters: Tuple[str, str, str],
+        pos: int,
+        endpos: int,
+        deadline: Optional[float] = None
+    ):
+        """
+        Yields the matches of a multi-line rule between pos and endpos, as finditer would.
+
+        A lazy pattern such as <script[^>]*>.*?</script> makes the regex engine try
+        every opening literal and run each one to the end of the text when no
+        closing literal follows, which is quadratic in the number of openings.
+        Instead each opening is paired with the first tag end and closing literal
+        after it using str.find(), and the rule only runs over that window. Once an
+        opening has no closing literal after it, neither has any later one.
+
+        Args:
+            code: The code being scanned
+            folded_code: fold_case() of the code, for the literal searches
+            compiled_pattern: The rule's compiled pattern
+            delimiters: The rule's (opening, tag_end, closing) literals
+            pos: Offset to search from
+            endpos: Offset to search up to
+            deadline: time.perf_counter() value to stop at, checked before each window
+
+        Yields:
+            Matches in document order
+        """
+        opening, tag_end, closing = delimiters
+        while True:
+            check_deadline(deadline)
+            start = folded_code.find(opening, pos, endpos)
+            if start == -1:
+                return
+            end = folded_code.find(tag_end, start + len(opening), endpos)
+            if end == -1:
+                return
+            end = folded_code.find(closing, end + len(tag_end), endpos)
+            if end == -1:
+                return
+            match = next(compiled_pattern.finditer(code, start, end + len(closing)), None)
+            if match is None:
+                # The engine folds case differently from fold_case(), as RE2 does
+                # for dotless i; search on as finditer would
+                match = next(compiled_pattern.finditer(code, start, endpos), None)
+                if match is None:
+                    return
+            yield match
+            pos = match.end()
+
+    def _iter_cross_line_matches(
+        self,
+        code: str,
+        folded_code: str,
+        line_index: LineIndex,
+        compiled_pattern: Any,
+        delimiters: Tuple[str, str, str],
+        single_line_starts: List[int],
+        deadline: Optional[float] = None
+    ):
+        """
+        Yields the matches of a multi-line rule that span more than one line.
+
+        A match is dropped when a single-line match of the same rule starts inside
+        it, so findings that fit on one line keep their line number.
+
+        Args:
+            code: The code being scanned
+            folded_code: fold_case() of the code
+            line_index: Line index of the code
+            compiled_pattern: The rule's compiled pattern
+            delimiters: The rule's (opening, tag_end, closing) literals
+            single_line_starts: Sorted start offsets of the rule's single-line matches
+            deadline: time.perf_counter() value to stop at, checked before each window
+
+        Yields:
+            Tuples of (line_number, match)
+        """
+        matches = self._iter_delimited_matches(
+            code, folded_code, compiled_pattern, delimiters, 0, len(code), deadline
+        )
+        for match in matches:
+            start, end = match.span()
+            line_number = line_index.line_number(start)
+            line_end = line_index.ends[line_number - 1]
+            if start > line_end or end <= line_end:
+                continue
+
+            position = bisect_left(single_line_starts, start)
+            if position < len(single_line_starts) and single_line_starts[position] < end:
+                continue
+
+            yield line_number, match
+
+    def _iter_rule_matches(
+        self,
+        code: str,
+        line_index: LineIndex,
+        comment_map: Optional[CommentMap],
+        vulnerability_name: str,
+        candidate_lines: Any,
+        deadline: Optional[float] = None,
+        counters: Optional[List[float]] = None
+    ) -> Iterator[Tuple[int, int, Any]]:
+        """
+        Yields the matches of one rule that are not inside comments.
+
+        Single-line rules are searched lazily, one candidate line at a time, so
+        nothing past the last line scan_code reports is ever searched. Multi-line
+        rules need every single-line match before the cross-line pass, so they are
+        collected first and yielded sorted; both passes search delimited windows,
+        see _iter_delimited_matches.
+
+        Args:
+            code: The code being scanned
+            line_index: Line index of the code
+            comment_map: Comment spans of the code, or None to keep matches in comments
+            vulnerability_name: Name of the rule
+            candidate_lines: Ascending line numbers the rule can match on
+            deadline: time.perf_counter() value to stop at
+            counters: The rule's instrumentation counters, which receive the
+                matches suppressed as comments
+
+        Yields:
+            Tuples of (line_number, start_offset, match) in document order
+
+        Raises:
+            ScanTimeoutError: With the name of this rule
+        """
+        compiled_pattern = self.compiled_patterns[vulnerability_name]
+        try:
+            if vulnerability_name not in self.multiline_rules:
+                backtracks = (
+                    vulnerability_name in self.backtracking_rules
+                    and self.rule_backends[vulnerability_name] == "re"
+                )
+                line_matches = self._iter_line_matches(
+                    code, line_index, compiled_pattern, candidate_lines, deadline,
+                    self.max_line_length if backtracks else 0
+                )
+                for line_number, match in line_matches:
+                    start = match.start()
+                    # Skip if this match appears to be in a comment
+                    if comment_map is None or not comment_map.is_comment(start):
+                        yield line_number, start, match
+                    elif counters is not None:
+                        counters[2] += 1
+                        counters[3] += 1
+                return
+
+            check_deadline(deadline)
+            folded_code = fold_case(code)
+            delimiters = self.multiline_rules[vulnerability_name]
+            found_matches = []
+            single_line_starts = []
+            for line_number in candidate_lines:
+                line_matches = self._iter_delimited_matches(
+                    code, folded_code, compiled_pattern, delimiters,
+                    line_index.starts[line_number - 1], line_index.ends[line_number - 1], deadline
+                )
+                for match in line_matches:
+                    start = match.start()
+                    single_line_starts.append(start)
+                    if comment_map is None or not comment_map.is_comment(start):
+                        found_matches.append((line_number, start, match))
+                    elif counters is not None:
+                        counters[2] += 1
+                        counters[3] += 1
+
+            cross_line_matches = self._iter_cross_line_matches(
+                code, folded_code, line_index, compiled_pattern, delimiters, single_line_starts, deadline
+            )
+            for line_number, match in cross_line_matches:
+                start = match.start()
+                if comment_map is None or not comment_map.is_comment(start):
+                    found_matches.append((line_number, start, match))
+                elif counters is not None:
+                    counters[2] += 1
+                    counters[3] += 1
+
+            check_deadline(deadline)
+            found_matches.sort(key=itemgetter(0, 1))
+            yield from found_matches
+        except ScanTimeoutError as timeout:
+            timeout.rule = vulnerability_name
+            raise
+        except Exception as e:
+            logger.warning(f"Error scanning for {vulnerability_name}: {e}")
+
+    def _track_progress(
+        self,
+        candidate_lines: Dict[str, Any],
+        progress: Callable[[float], None]
+    ) -> Dict[str, Iterator[int]]:
+        """
+        Wraps candidate lines so that progress is called as the rules search them.
+
+        Args:
+            candidate_lines: Candidate lines of the rules, from _find_candidate_lines
+            progress: Function called with the share of all candidate line searches
+                done, after each one
+
+        Returns:
+            Dictionary mapping the rules with candidate lines to iterators over them
+        """
+        total = sum(len(lines) for lines in candidate_lines.values())
+        done = 0
+
+        def count_searches(lines: Any) -> Iterator[int]:
+            nonlocal done
+            for line_number in lines:
+                yield line_number
+                done += 1
+                progress(done / total)
+
+        return {name: count_searches(lines) for name, lines in candidate_lines.items() if lines}
+
+    def _merge_rule_matches(
+        self,
+        code: str,
+        line_index: LineIndex,
+        comment_map: Optional[CommentMap],
+        candidate_lines: Dict[str, Any],
+        deadline: Optional[float] = None,
+        rule_table: Optional[Dict[str, List[float]]] = None
+    ) -> Iterator[Tuple[int, int, int, int, str]]:
+        """
+        Merges the matches of the rules in candidate_lines by line, in rule order within a line.
+
+        Args:
+            code: The code being scanned
+            line_index: Line index of the code
+            comment_map: Comment spans of the code, or None to keep matches in comments
+            candidate_lines: Candidate lines of the rules to run, from _find_candidate_lines
+            deadline: time.perf_counter() value to stop at
+            rule_table: Per-scan RuleStats table to count into, None when not instrumented
+
+        Returns:
+            Iterator of (line_number, rule_order, start, end, rule_name) in document order
+        """
+        def tag_rule(rule_order: int, vulnerability_name: str):
+            if rule_table is None:
+                rule_matches = self._iter_rule_matches(
+                    code, line_index, comment_map, vulnerability_name,
+                    candidate_lines[vulnerability_name], deadline
+                )
+                for line_number, start, match in rule_matches:
+                    yield line_number, rule_order, start, match.end(), vulnerability_name
+                return
+
+            # Instrumented: time every step of the rule's generator
+            counters = _rule_counters(rule_table, vulnerability_name)
+            counters[1] += 1
+            rule_matches = self._iter_rule_matches(
+                code, line_index, comment_map, vulnerability_name,
+                candidate_lines[vulnerability_name], deadline, counters
+            )
+            while True:
+                started = time.perf_counter()
+                try:
+                    item = next(rule_matches, None)
+                finally:
+                    counters[0] += time.perf_counter() - started
+                if item is None:
+                    return
+                counters[2] += 1
+                line_number, start, match = item
+                yield line_number, rule_order, start, match.end(), vulnerability_name
+
+        return merge(
+            *(
+                tag_rule(rule_order, vulnerability_name)
+                for rule_order, vulnerability_name in enumerate(self.compiled_patterns)
+                if candidate_lines.get(vulnerability_name)
+            ),
+            key=itemgetter(0, 1, 2)
+        )
+
+    def _split_chunks(self, code: str) -> List[Tuple[int, int]]:
+        """
+        Splits a document into spans of about chunk_size characters ending at line breaks.
+
+        Returns:
+            List of (start, end) offsets covering the document in order
+        """
+        chunks = []
+        start = 0
+        while start < len(code):
+            end = start + max(self.chunk_size, 1)
+            if end < len(code):
+                # Starting one character back keeps a \r\n pair in one chunk
+                line_break = LINE_BREAK_PATTERN.search(code, end - 1)
+                end = len(code) if line_break is None else line_break.end()
+            else:
+                end = len(code)
+            chunks.append((start, end))
+            start = end
+        return chunks
+
+    def find_chunk_matches(
+        self,
+        chunk: str,
+        context_length: int = 0,
+        deadline: Optional[float] = None,
+        rule_table: Optional[Dict[str, List[float]]] = None
+    ) -> Tuple[List[Tuple[int, int, int, int]], Optional[str]]:
+        """
+        Runs the single-line rules over one chunk of a document, without comment filtering.
+
+        Comment and string state depends on everything before the chunk, so the
+        caller filters the matches with a comment map of the whole document.
+
+        Args:
+            chunk: Whole lines of the document, preceded by context_length characters
+                of lookbehind context that are not scanned themselves
+            context_length: Length of the context at the start of chunk
+            deadline: time.perf_counter() value to stop at
+            rule_table: Per-scan RuleStats table to count into, None when not instrumented
+
+        Returns:
+            Tuple of (matches, timed_out_rule). Matches are (line_number, rule_order,
+            start, end) in document order, with lines counted from the chunk's first
+            line and offsets from its end of context. When the deadline passes the
+            matches found so far are returned with the rule that was running.
+        """
+        line_index = LineIndex(chunk)
+        context_lines = line_index.line_number(context_length) - 1 if context_length else 0
+
+        single_line_rules = [name for name in self.compiled_patterns if name not in self.multiline_rules]
+        candidate_lines = {
+            name: lines[bisect_right(lines, context_lines):]
+            for name, lines in self._find_candidate_lines(chunk, line_index, single_line_rules).items()
+        }
+
+        matches = []
+        try:
+            for line_number, rule_order, start, end, _ in self._merge_rule_matches(
+                chunk, line_index, None, candidate_lines, deadline, rule_table
+            ):
+                matches.append((line_number - context_lines, rule_order, start - context_length, end - context_length))
+        except ScanTimeoutError as timeout:
+            return matches, timeout.rule
+        return matches, None
+
+    def can_scan_in_chunks(self) -> bool:
+        """
+        Whether this scanner's documents can be split into chunks for worker processes.
+
+        Workers scan chunks with a default scanner for the same regex backend, so
+        this scanner's ruleset has to be the default one.
+        """
+        return get_chunk_scanner(self.regex_backend.name).ruleset_version == self.ruleset_version
+
+    def _iter_chunked_matches(
+        self,
+        code: str,
+        executor: Executor,
+        deadline: Optional[float] = None,
+        rule_table: Optional[Dict[str, List[float]]] = None,
+        timings: Optional[Dict[str, float]] = None,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Iterator[Tuple[int, int, int, int, str]]:
+        """
+        Finds the matches of every rule with the single-line rules split across workers.
+
+        Chunks end at line breaks and single-line matches never cross one, so every
+        match lies in exactly one chunk and the chunks need no overlap beyond the
+        lookbehind context. While the workers scan, this process indexes lines, lexes
+        comments and runs the multi-line rules, whose matches have no length bound,
+        over the whole document. Chunk results are filtered for comments and merged
+        with those matches in chunk order, giving the matches of a serial scan in
+        the same order. Chunks not yet needed are cancelled when the caller stops.
+
+        Args:
+            code: The code being scanned
+            executor: Pool that runs scan_chunk, normally a ProcessPoolExecutor
+            deadline: time.perf_counter() value to stop at
+            rule_table: Per-scan RuleStats table to count into, including the
+                counts of the workers, None when not instrumented
+            timings: Optional dictionary that receives the comment filtering time
+            progress: Optional function called with the share of chunks done, after each one
+
+        Yields:
+            Tuples of (line_number, rule_order, start, end, rule_name) in document order
+        """
+        chunks = self._split_chunks(code)
+        # perf_counter() values mean nothing in another process, so workers get wall time
+        wall_deadline = None if deadline is None else time.time() + deadline - time.perf_counter()
+        futures = []
+        try:
+            for start, end in chunks:
+                context_start = max(start - self.max_lookbehind, 0)
+                futures.append(executor.submit(
+                    scan_chunk, self.regex_backend.name, code[context_start:end],
+                    start - context_start, wall_deadline, rule_table is not None
+                ))
+
+            line_index = LineIndex(code)
+            comment_map = CommentMap(code) if timings is None else TimedCommentMap(code, timings)
+            multiline_matches = self._merge_rule_matches(
+                code, line_index, comment_map,
+                self._find_candidate_lines(code, line_index, self.multiline_rules), deadline, rule_table
+            )
+            rule_names = list(self.compiled_patterns)
+
+            def iter_chunk_matches():
+                for chunk_number, ((chunk_start, _), future) in enumerate(zip(chunks, futures), 1):
+                    matches, timed_out_rule, chunk_table = future.result()
+                    if rule_table is not None:
+                        for name, counters in chunk_table.items():
+                            rule_counters = _rule_counters(rule_table, name)
+                            for position, value in enumerate(counters):
+                                rule_counters[position] += value
+                    first_line = line_index.line_number(chunk_start)
+                    for line_number, rule_order, start, end in matches:
+                        start += chunk_start
+                        if not comment_map.is_comment(start):
+                            yield first_line + line_number - 1, rule_order, start, chunk_start + end, rule_names[rule_order]
+                        elif rule_table is not None:
+                            _rule_counters(rule_table, rule_names[rule_order])[3] += 1
+                    if timed_out_rule is not None:
+                        raise ScanTimeoutError(timed_out_rule)
+                    if progress is not None:
+                        progress(chunk_number / len(chunks))
+
+            yield from merge(multiline_matches, iter_chunk_matches(), key=itemgetter(0, 1, 2))
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _get_ruleset_version(self) -> str:
+        """
+        Fingerprints everything besides the code that decides a scan result.
+
+        Covers each rule's pattern, description, regex engine and line length
+        limit, so changing _get_vulnerability_patterns yields a new version and
+        new cache keys.
+
+        Returns:
+            Hex digest of the ruleset
+        """
+        ruleset = hashlib.blake2b(digest_size=8)
+        for name, pattern in self.vulnerability_patterns.items():
+            backend = self.rule_backends.get(name)
+            max_line_length = self.max_line_length if name in self.backtracking_rules and backend == "re" else 0
+            rule = (name, pattern, self._get_vulnerability_description(name), backend, max_line_length)
+            ruleset.update(repr(rule).encode("utf-8"))
+        return ruleset.hexdigest()
+
+    def cache_key(self, code: str) -> str:
+        """
+        Returns the result cache key of a scan of this code.
+
+        The code is truncated to max_code_length and its line breaks normalized
+        first, as iter_findings does, so code that only differs in its line
+        endings shares a key. Other whitespace is hashed as is: it is part of
+        the snippets and can decide whether a rule matches. The scan limits are
+        part of the key along with the ruleset version.
+
+        Args:
+            code: The code to be scanned
+
+        Returns:
+            Cache key string
+        """
+        code_hash = hashlib.blake2b(
+            normalize_line_breaks(code[:self.max_code_length]).encode("utf-8", "surrogatepass"), digest_size=16
+        ).hexdigest()
+        return f"{self.ruleset_version}:{self.max_code_length}:{self.max_vulnerabilities}:{code_hash}"
+
+    def get_cached_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns a copy of the result cached under a cache_key, or None"""
+        if self.result_cache is None:
+            return None
+        result = self.result_cache.get(key)
+        if result is None:
+            return None
+        return copy_result(result)
+
+    def cache_result(self, key: str, result: Dict[str, Any]) -> None:
+        """Caches a complete scan result; partial results depend on timing and are not kept"""
+        if self.result_cache is not None and not result.get("partial"):
+            self.result_cache.set(key, copy_result(cacheable_result(result)))
 
     def _get_vulnerability_description(self, vulnerability_type: str) -> str:
         """Get human-readable description for vulnerability type"""
@@ -152,46 +1156,202 @@ class XSSScanner:
         }
         return descriptions.get(vulnerability_type, "Potential XSS vulnerability detected")
 
-    def scan_code(self, code: str) -> Dict[str, Any]:
+    def iter_findings(
+        self,
+        code: str,
+        time_budget: Optional[float] = None,
+        summary: Optional[Dict[str, Any]] = None,
+        executor: Optional[Executor] = None,
+        timings: Optional[Dict[str, float]] = None,
+        progress: Optional[Callable[[float], None]] = None
+    ) -> Iterator[Dict[str, Any]]:
         """
-        Scans provided code for XSS vulnerabilities with performance optimizations.
+        Yields vulnerabilities one at a time, in the order scan_code reports them.
+
+        Rules are run lazily and their matches merged by line, so each finding is
+        yielded as soon as every rule has moved past its line. The scan is checked
+        against its time budget before each line a rule searches; when the budget
+        runs out the generator stops and summary records partial results and the
+        rule that was running. A single regex search is not interrupted; on re,
+        the rules prone to backtracking skip lines longer than max_line_length to
+        bound it, while the RE2 backend bounds every search by its line's length.
+        A search that overran is still reported as partial once it returns.
+
+        Given an executor, documents of at least parallel_threshold characters are
+        split into line-aligned chunks scanned by the executor's workers; the
+        findings are the same as those of a serial scan.
 
         Args:
             code: The HTML/JavaScript code to analyze
+            time_budget: Seconds the scan may take, defaults to self.time_budget;
+                0 or less for no limit
+            summary: Optional dictionary that receives the result fields of
+                scan_code other than vulnerabilities once the generator finishes
+            executor: Optional process pool for scanning large documents in chunks
+            timings: Optional dictionary that receives the seconds spent in the
+                prefilter, in comment filtering and in the rest of the matching,
+                as prefilter, comment_filtering and regex_matching; chunked scans
+                count their prefilter as matching
+            progress: Optional function called with the share of the scan done,
+                from 0 to 1, as candidate lines (or chunks, in chunked scans) are
+                searched, whether or not they hold findings
 
-        Returns:
-            Dictionary containing scan results
+        Yields:
+            Vulnerability dictionaries
         """
-        try:
-            logger.info("Starting XSS scan")
+        if time_budget is None:
+            time_budget = self.time_budget
+        deadline = time.perf_counter() + time_budget if time_budget > 0 else None
+
+        # Limit code size for performance
+        if len(code) > self.max_code_length:
+            code = code[:self.max_code_length]
+            logger.warning(f"Code truncated to {self.max_code_length} characters for performance")
+
+        # Rules match every line break alike, so only the snippets spanning lines
+        # change; it lets code that differs in its line endings share a cache entry
+        code = normalize_line_breaks(code)
 
-            # Limit code size for performance
-            if len(code) > self.max_code_length:
-                code = code[:self.max_code_length]
-                logger.warning(f"Code truncated to {self.max_code_length} characters for performance")
+        # Per-rule counters of this scan, merged into rule_stats when it ends
+        rule_stats = self.rule_stats
+        rule_table = RuleStats.new_table() if rule_stats is not None else None
 
-            # Split the code into individual lines for analysis
-            code_lines = code.splitlines()
+        if timings is not None:
+            timings.update(prefilter=0.0, comment_filtering=0.0)
+            phase_started = time.perf_counter()
 
-            # List to store all found vulnerabilities
-            all_vulnerabilities = []
+        if executor is not None and len(code) >= self.parallel_threshold and self.can_scan_in_chunks():
+            rule_matches = self._iter_chunked_matches(code, executor, deadline, rule_table, timings, progress)
+        else:
+            # Index line offsets once instead of splitting the code into lines
+            line_index = LineIndex(code)
 
-            # Scan each line of code with early exit for performance
-            for line_number, line in enumerate(code_lines, start=1):
-                if len(all_vulnerabilities) >= self.max_vulnerabilities:
+            # Literal prefilter: rules only run from lines where their literal occurs
+            candidate_lines = self._find_candidate_lines(code, line_index)
+            if progress is not None:
+                candidate_lines = self._track_progress(candidate_lines, progress)
+
+            # Comment spans, lexed once on the first match that needs them
+            if timings is None:
+                comment_map = CommentMap(code)
+            else:
+                comment_map = TimedCommentMap(code, timings)
+                timings["prefilter"] = time.perf_counter() - phase_started
+                phase_started = time.perf_counter()
+
+            rule_matches = self._merge_rule_matches(
+                code, line_index, comment_map, candidate_lines, deadline, rule_table
+            )
+
+        vulnerabilities_found = 0
+        timed_out_rule = None
+        partial = False
+        previous_line = None
+        try:
+            for line_number, _, start, end, vulnerability_name in rule_matches:
+                # Early exit, but only at a line boundary
+                if line_number != previous_line and vulnerabilities_found >= self.max_vulnerabilities:
                     logger.warning(f"Scan stopped early: reached maximum vulnerabilities limit ({self.max_vulnerabilities})")
                     break
+                previous_line = line_number
 
-                line_vulnerabilities = self._scan_line_for_vulnerabilities(line, line_number)
-                all_vulnerabilities.extend(line_vulnerabilities)
+                vulnerabilities_found += 1
+                yield {
+                    "line": line_number,
+                    "vulnerability_type": vulnerability_name,
+                    "snippet": code[start:end].strip(),
+                    "confidence": "medium",
+                    "description": self._get_vulnerability_description(vulnerability_name)
+                }
+        except ScanTimeoutError as timeout:
+            partial = True
+            timed_out_rule = timeout.rule
+            logger.warning(f"Scan stopped: time budget of {time_budget}s exceeded while running {timed_out_rule}")
+        finally:
+            rule_matches.close()
+            if rule_stats is not None:
+                rule_stats.merge(rule_table)
+            if timings is not None:
+                timings["regex_matching"] = max(
+                    time.perf_counter() - phase_started - timings["comment_filtering"], 0.0
+                )
 
-            result = {
+        if partial:
+            message = (
+                f"Scan stopped after its {time_budget}s time budget. "
+                f"Found {vulnerabilities_found} potential vulnerabilities before stopping."
+            )
+        else:
+            message = f"Scan completed. Found {vulnerabilities_found} potential vulnerabilities."
+
+        if summary is not None:
+            summary.update({
                 "status": "success",
-                "vulnerabilities_found": len(all_vulnerabilities),
+                "vulnerabilities_found": vulnerabilities_found,
+                "message": message,
+                "partial": partial,
+                "timed_out_rule": timed_out_rule
+            })
+
+    def scan_code(
+        self,
+        code: str,
+        time_budget: Optional[float] = None,
+        use_cache: bool = True,
+        executor: Optional[Executor] = None,
+        timings: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Scans provided code for XSS vulnerabilities with performance optimizations.
+
+        Args:
+            code: The HTML/JavaScript code to analyze
+            time_budget: Seconds the scan may take, defaults to self.time_budget;
+                0 or less for no limit
+            use_cache: Whether to consult and fill result_cache
+            executor: Optional process pool for scanning large documents in chunks,
+                see iter_findings
+            timings: Whether to add the time spent in each phase of the scan, as
+                iter_findings records it, under "timings"
+
+        Returns:
+            Dictionary containing scan results, with scan_duration and the
+            code_length of the code as given
+        """
+        try:
+            started = time.perf_counter()
+            use_cache = use_cache and self.result_cache is not None
+            if use_cache:
+                key = self.cache_key(code)
+                cached_result = self.get_cached_result(key)
+                if cached_result is not None:
+                    logger.info("Scan served from cache")
+                    if timings:
+                        cached_result["timings"] = {"prefilter": 0.0, "regex_matching": 0.0, "comment_filtering": 0.0}
+                    cached_result.update(scan_duration=time.perf_counter() - started, code_length=len(code))
+                    return cached_result
+
+            logger.info("Starting XSS scan")
+
+            summary = {}
+            phase_timings = {} if timings else None
+            all_vulnerabilities = list(self.iter_findings(code, time_budget, summary, executor, phase_timings))
+
+            result = {
+                "status": summary["status"],
+                "vulnerabilities_found": summary["vulnerabilities_found"],
                 "vulnerabilities": all_vulnerabilities,
-                "message": f"Scan completed. Found {len(all_vulnerabilities)} potential vulnerabilities."
+                "message": summary["message"],
+                "partial": summary["partial"],
+                "timed_out_rule": summary["timed_out_rule"]
             }
 
+            if use_cache:
+                self.cache_result(key, result)
+
+            if timings:
+                result["timings"] = phase_timings
+            result.update(scan_duration=time.perf_counter() - started, code_length=len(code))
             logger.info(f"Scan completed: {len(all_vulnerabilities)} vulnerabilities found")
             return result
 
@@ -199,5 +1359,37 @@ class XSSScanner:
             logger.error(f"Error during scanning: {str(error)}")
             raise Exception(f"An error occurred during scanning: {str(error)}")
 
+@lru_cache(maxsize=None)
+def get_chunk_scanner(regex_backend: str) -> XSSScanner:
+    """Returns the process's default scanner for a regex backend, used to scan chunks"""
+    return XSSScanner(regex_backend=regex_backend)
+
+def scan_chunk(
+    regex_backend: str,
+    chunk: str,
+    context_length: int,
+    wall_deadline: Optional[float],
+    instrument: bool = False
+) -> Tuple[List[Tuple[int, int, int, int]], Optional[str], Optional[Dict[str, List[float]]]]:
+    """
+    Worker entry point of chunked scans, see XSSScanner.find_chunk_matches.
+
+    Args:
+        regex_backend: Name of the scanning process's regex backend
+        chunk: The chunk, preceded by its lookbehind context
+        context_length: Length of the context
+        wall_deadline: time.time() value to stop at, or None for no limit
+        instrument: Whether to count per-rule statistics for the caller
+
+    Returns:
+        The matches and timed out rule, plus the chunk's RuleStats table when instrumented
+    """
+    deadline = None if wall_deadline is None else time.perf_counter() + wall_deadline - time.time()
+    rule_table = RuleStats.new_table() if instrument else None
+    matches, timed_out_rule = get_chunk_scanner(regex_backend).find_chunk_matches(
+        chunk, context_length, deadline, rule_table
+    )
+    return matches, timed_out_rule, rule_table
+
 # Global scanner instance
-scanner = XSSScanner()
+scanner = XSSScanner(result_cache=ScanResultCache())
@@ -0,0 +1,533 @@
+"""
+Command line scanner for directories and repositories
+
+Usage:
+    python -m xss_scanner [paths ...] [--format text|json|sarif] [--output FILE]
+    python -m xss_scanner --base origin/main
+    git diff origin/main | python -m xss_scanner --diff -
+
+Walks the given directories for .html, .js, .jsx, .ts and .vue files, skipping
+files matched by .gitignore as well as vendored and minified code, and scans
+them on a process pool. With --base or --diff only the files a diff changes are
+scanned, and only findings on the lines it touches are reported. Results are
+cached on disk by git blob hash, so unchanged files are not scanned again.
+Exits with 1 when vulnerabilities are found.
+"""
+import os
+import re
+import sys
+import json
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+from config import config
+from utils import XSSScanner, cacheable_result
+from incremental import BlobResultCache, parse_unified_diff, git_diff, git_blob_hash, filter_findings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXTENSIONS = (".html", ".js", ".jsx", ".ts", ".vue")
+
+# Directories holding third-party or generated code
+VENDORED_DIRECTORIES = {
+    ".git", ".hg", ".svn", "node_modules", "bower_components", "jspm_packages",
+    "vendor", "vendors", "third_party", "third-party", "__pycache__"
+}
+
+# File names of minified or bundled builds
+MINIFIED_FILE_PATTERN = re.compile(r"[.-]min\.[^.]+$|\.bundle\.js$|\.chunk\.js$")
+
+# Files with longer lines on average are treated as minified
+MINIFIED_AVERAGE_LINE_LENGTH = 500
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+DEFAULT_CACHE_DIR = os.getenv(
+    "XSS_SCANNER_CACHE_DIR",
+    os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "xss-scanner")
+)
+
+class GitIgnore:
+    """
+    Rules from the .gitignore files of a directory tree.
+
+    Supports comments, negation, directory-only rules, anchored rules and *, ?,
+    ** and [] wildcards. Rules of a .gitignore file apply below its directory,
+    and later rules override earlier ones as in git.
+    """
+
+    def __init__(self):
+        self.rules: List[Tuple[str, Any, bool, bool]] = []
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Translates a gitignore glob to a regex matching paths relative to its directory"""
+        anchored = "/" in pattern
+        pattern = pattern.lstrip("/")
+        parts = []
+        position = 0
+        while position < len(pattern):
+            if pattern.startswith("**/", position):
+                parts.append("(?:.*/)?")
+                position += 3
+            elif pattern.startswith("**", position):
+                parts.append(".*")
+                position += 2
+            elif pattern[position] == "*":
+                parts.append("[^/]*")
+                position += 1
+            elif pattern[position] == "?":
+                parts.append("[^/]")
+                position += 1
+            elif pattern[position] == "[" and "]" in pattern[position + 2:]:
+                end = pattern.index("]", position + 2)
+                characters = pattern[position + 1:end]
+                if characters.startswith("!"):
+                    characters = "^" + characters[1:]
+                parts.append(f"[{characters}]")
+                position = end + 1
+            else:
+                parts.append(re.escape(pattern[position]))
+                position += 1
+        prefix = "" if anchored else "(?:.*/)?"
+        return f"{prefix}{''.join(parts)}(?:/.*)?$"
+
+    def add_file(self, base: str, path: str) -> None:
+        """
+        Adds the rules of a .gitignore file.
+
+        Args:
+            base: Directory of the file, relative to the tree root ("" for the root)
+            path: Path of the .gitignore file
+        """
+        try:
+            with open(path, encoding="utf-8", errors="replace") as gitignore:
+                lines = gitignore.read().splitlines()
+        except OSError as e:
+            logger.warning(f"Cannot read {path}: {e}")
+            return
+
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            directory_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            try:
+                regex = re.compile(self._translate(line))
+            except re.error:
+                logger.warning(f"Ignoring unsupported .gitignore pattern {line!r} in {path}")
+                continue
+            self.rules.append((base, regex, negate, directory_only))
+
+    def is_ignored(self, relative_path: str, is_directory: bool) -> bool:
+        """
+        Returns whether a path is ignored.
+
+        Args:
+            relative_path: Path relative to the tree root, with / separators
+            is_directory: Whether the path is a directory
+        """
+        ignored = False
+        for base, regex, negate, directory_only in self.rules:
+            if directory_only and not is_directory:
+                continue
+            if base:
+                if not relative_path.startswith(base + "/"):
+                    continue
+                path = relative_path[len(base) + 1:]
+            else:
+                path = relative_path
+            if regex.match(path):
+                ignored = not negate
+        return ignored
+
+def is_minified(code: str) -> bool:
+    """Returns whether code looks minified: a few very long lines"""
+    return len(code) >= MINIFIED_AVERAGE_LINE_LENGTH and len(code) / (code.count("\n") + 1) > MINIFIED_AVERAGE_LINE_LENGTH
+
+def is_vendored(path: str) -> bool:
+    """Returns whether a path is in a vendored directory or names a minified file"""
+    parts = path.replace(os.sep, "/").split("/")
+    return any(part in VENDORED_DIRECTORIES for part in parts[:-1]) or bool(MINIFIED_FILE_PATTERN.search(parts[-1].lower()))
+
+def iter_source_files(
+    root: str,
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+    use_gitignore: bool = True,
+    skip_vendored: bool = True
+) -> Iterator[str]:
+    """
+    Yields the files of a directory tree that should be scanned, in sorted order.
+
+    Args:
+        root: Directory to walk
+        extensions: File extensions to scan
+        use_gitignore: Whether to skip files matched by .gitignore files
+        skip_vendored: Whether to skip vendored directories and minified file names
+
+    Yields:
+        File paths under root
+    """
+    gitignore = GitIgnore()
+    for directory, directories, files in os.walk(root):
+        relative_directory = os.path.relpath(directory, root).replace(os.sep, "/")
+        if relative_directory == ".":
+            relative_directory = ""
+        prefix = relative_directory + "/" if relative_directory else ""
+
+        if use_gitignore and ".gitignore" in files:
+            gitignore.add_file(relative_directory, os.path.join(directory, ".gitignore"))
+
+        directories[:] = sorted(
+            name for name in directories
+            if not (skip_vendored and name in VENDORED_DIRECTORIES)
+            and name != ".git"
+            and not (use_gitignore and gitignore.is_ignored(prefix + name, True))
+        )
+        for name in sorted(files):
+            if not name.lower().endswith(extensions):
+                continue
+            if skip_vendored and MINIFIED_FILE_PATTERN.search(name.lower()):
+                continue
+            if use_gitignore and gitignore.is_ignored(prefix + name, False):
+                continue
+            yield os.path.join(directory, name)
+
+def collect_files(
+    paths: List[str],
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+    use_gitignore: bool = True,
+    skip_vendored: bool = True
+) -> List[str]:
+    """
+    Expands the paths given on the command line into the files to scan.
+
+    Files named explicitly are always scanned; directories are walked with
+    iter_source_files.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(iter_source_files(path, extensions, use_gitignore, skip_vendored))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            logger.warning(f"No such file or directory: {path}")
+    return list(dict.fromkeys(files))
+
+def collect_changed_files(
+    touched_lines: Dict[str, List[int]],
+    paths: List[str],
+    extensions: Tuple[str, ...] = DEFAULT_EXTENSIONS,
+    skip_vendored: bool = True
+) -> Dict[str, List[int]]:
+    """
+    Selects the changed files to scan from a parsed diff.
+
+    Args:
+        touched_lines: Touched lines by path, from parse_unified_diff
+        paths: Only files under these files or directories are scanned
+        extensions: File extensions to scan
+        skip_vendored: Whether to skip vendored directories and minified file names
+
+    Returns:
+        Touched lines by path of the files to scan
+    """
+    roots = [os.path.abspath(path) for path in paths]
+    changed_files = {}
+    for path, lines in touched_lines.items():
+        absolute_path = os.path.abspath(path)
+        if not lines or not os.path.isfile(path) or not path.lower().endswith(extensions):
+            continue
+        if skip_vendored and is_vendored(path):
+            continue
+        if not any(absolute_path == root or absolute_path.startswith(root.rstrip(os.sep) + os.sep) for root in roots):
+            continue
+        changed_files[path] = lines
+    return changed_files
+
+# Scanner and result cache of a worker process, set up by _init_worker
+_cli_scanner: Optional[XSSScanner] = None
+_blob_cache: Optional[BlobResultCache] = None
+_skip_minified = True
+
+def _init_worker(max_vulnerabilities: int, time_budget: float, skip_minified: bool, cache_dir: Optional[str] = None) -> None:
+    """Process pool initializer: builds the worker's scanner with the CLI limits"""
+    global _cli_scanner, _blob_cache, _skip_minified
+    _cli_scanner = XSSScanner()
+    _cli_scanner.max_code_length = config.SCAN_JOB_MAX_CODE_LENGTH
+    _cli_scanner.max_vulnerabilities = max_vulnerabilities
+    _cli_scanner.time_budget = time_budget
+    _skip_minified = skip_minified
+    _blob_cache = None
+    if cache_dir:
+        scanner_key = f"{_cli_scanner.ruleset_version}-{_cli_scanner.max_code_length}-{max_vulnerabilities}"
+        _blob_cache = BlobResultCache(cache_dir, scanner_key)
+
+def scan_file(path: str) -> Dict[str, Any]:
+    """
+    Scans one file with the worker's scanner, or takes its result from the blob cache.
+
+    Returns:
+        The scan result with the file's path, or the path with a skipped reason
+        or an error message
+    """
+    try:
+        with open(path, "rb") as source:
+            data = source.read()
+    except OSError as e:
+        return {"path": path, "error": str(e)}
+
+    blob_hash = git_blob_hash(data) if _blob_cache is not None else None
+    if blob_hash is not None:
+        cached_result = _blob_cache.get(blob_hash)
+        if cached_result is not None:
+            return {"path": path, **cached_result}
+
+    code = data.decode("utf-8", "replace")
+    if _skip_minified and is_minified(code):
+        return {"path": path, "skipped": "minified"}
+    try:
+        # Leave out the timing fields, so reports and cache entries do not vary between runs
+        result = cacheable_result(_cli_scanner.scan_code(code, use_cache=False))
+    except Exception as e:
+        return {"path": path, "error": str(e)}
+    if blob_hash is not None:
+        _blob_cache.set(blob_hash, result)
+    return {"path": path, **result}
+
+def scan_files(
+    files: List[str],
+    workers: int = os.cpu_count() or 1,
+    max_vulnerabilities: int = config.SCAN_JOB_MAX_VULNERABILITIES,
+    time_budget: float = config.SCAN_JOB_TIME_BUDGET,
+    skip_minified: bool = True,
+    cache_dir: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Scans files across a process pool.
+
+    Files are handed to the workers in chunks, so a worker takes several small
+    files per round trip instead of one.
+
+    Args:
+        files: Paths of the files to scan
+        workers: Worker processes; 1 scans in this process
+        max_vulnerabilities: Findings reported per file at most
+        time_budget: Seconds each file may take, 0 for no limit
+        skip_minified: Whether to skip files whose content looks minified
+        cache_dir: Directory of the blob result cache, None to scan every file
+
+    Returns:
+        Results of scan_file, in the order of files
+    """
+    initargs = (max_vulnerabilities, time_budget, skip_minified, cache_dir)
+    if workers <= 1 or len(files) <= 1:
+        _init_worker(*initargs)
+        return [scan_file(path) for path in files]
+
+    chunksize = max(1, min(64, len(files) // (workers * 4)))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=initargs
+    ) as pool:
+        return list(pool.map(scan_file, files, chunksize=chunksize))
+
+def _display_path(path: str) -> str:
+    """Path relative to the working directory, with / separators"""
+    relative_path = os.path.relpath(path)
+    if relative_path.startswith(".."):
+        relative_path = os.path.abspath(path)
+    return relative_path.replace(os.sep, "/")
+
+def build_report(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Builds the JSON report of a run"""
+    return {
+        "files_scanned": sum(1 for result in results if "vulnerabilities" in result),
+        "files_skipped": sum(1 for result in results if "skipped" in result),
+        "files_failed": sum(1 for result in results if "error" in result),
+        "vulnerabilities_found": sum(len(result.get("vulnerabilities", [])) for result in results),
+        "results": [{**result, "path": _display_path(result["path"])} for result in results]
+    }
+
+def format_text(report: Dict[str, Any]) -> str:
+    """Formats a report as one line per finding and a summary"""
+    lines = []
+    for result in report["results"]:
+        if "error" in result:
+            lines.append(f"{result['path']}: error: {result['error']}")
+            continue
+        for vulnerability in result.get("vulnerabilities", []):
+            lines.append(
+                f"{result['path']}:{vulnerability['line']}: {vulnerability['vulnerability_type']}: "
+                f"{vulnerability['snippet']}"
+            )
+        if result.get("partial"):
+            lines.append(f"{result['path']}: warning: {result['message']}")
+    lines.append(
+        f"Scanned {report['files_scanned']} files ({report['files_skipped']} skipped, "
+        f"{report['files_failed']} failed), found {report['vulnerabilities_found']} potential vulnerabilities."
+    )
+    return "\n".join(lines) + "\n"
+
+def format_json(report: Dict[str, Any]) -> str:
+    return json.dumps(report, indent=2) + "\n"
+
+def format_sarif(report: Dict[str, Any]) -> str:
+    """Formats a report as a SARIF 2.1.0 log for code scanning tools"""
+    rule_scanner = XSSScanner()
+    rules = [
+        {
+            "id": name,
+            "shortDescription": {"text": rule_scanner._get_vulnerability_description(name)},
+            "defaultConfiguration": {"level": "warning"}
+        }
+        for name in rule_scanner.vulnerability_patterns
+    ]
+    results = []
+    for result in report["results"]:
+        for vulnerability in result.get("vulnerabilities", []):
+            results.append({
+                "ruleId": vulnerability["vulnerability_type"],
+                "level": "warning",
+                "message": {"text": vulnerability["description"]},
+                "locations": [{
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": result["path"]},
+                        "region": {
+                            "startLine": vulnerability["line"],
+                            "snippet": {"text": vulnerability["snippet"]}
+                        }
+                    }
+                }]
+            })
+    sarif = {
+        "$schema": SARIF_SCHEMA,
+        "version": "2.1.0",
+        "runs": [{
+            "tool": {"driver": {"name": "xss-scanner", "rules": rules}},
+            "results": results
+        }]
+    }
+    return json.dumps(sarif, indent=2) + "\n"
+
+FORMATTERS = {"text": format_text, "json": format_json, "sarif": format_sarif}
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m xss_scanner",
+        description="Scan HTML and JavaScript files for potential XSS vulnerabilities."
+    )
+    parser.add_argument("paths", nargs="*", default=["."], help="files or directories to scan (default: .)")
+    parser.add_argument("-f", "--format", choices=sorted(FORMATTERS), default="text", help="output format")
+    parser.add_argument("-o", "--output", help="write the report to this file instead of stdout")
+    parser.add_argument(
+        "-e", "--extensions", default=",".join(DEFAULT_EXTENSIONS),
+        help="comma-separated file extensions to scan (default: %(default)s)"
+    )
+    parser.add_argument(
+        "-j", "--workers", type=int, default=os.cpu_count() or 1,
+        help="worker processes (default: number of CPUs)"
+    )
+    parser.add_argument(
+        "--max-vulnerabilities", type=int, default=config.SCAN_JOB_MAX_VULNERABILITIES,
+        help="findings reported per file at most (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--time-budget", type=float, default=config.SCAN_JOB_TIME_BUDGET,
+        help="seconds each file may take, 0 for no limit (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--base", metavar="REV",
+        help="only scan changes between REV and the working tree, e.g. origin/main"
+    )
+    parser.add_argument(
+        "--diff", metavar="FILE",
+        help="only scan changes in this unified diff (- for stdin); paths are relative to the working directory"
+    )
+    parser.add_argument(
+        "--context", type=int, default=0,
+        help="with --base or --diff, also report findings this many lines from a change (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--cache-dir", default=DEFAULT_CACHE_DIR,
+        help="directory of results cached by git blob hash (default: %(default)s)"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="scan every file, without the result cache")
+    parser.add_argument("--no-gitignore", action="store_true", help="scan files matched by .gitignore")
+    parser.add_argument("--include-vendored", action="store_true", help="scan vendored directories and minified files")
+    parser.add_argument("--exit-zero", action="store_true", help="exit with 0 even when vulnerabilities are found")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Runs the CLI and returns its exit code"""
+    logging.basicConfig(level=logging.ERROR, format="%(levelname)s: %(message)s")
+    args = parse_args(argv)
+
+    extensions = tuple(
+        extension if extension.startswith(".") else f".{extension}"
+        for extension in (extension.strip().lower() for extension in args.extensions.split(","))
+        if extension
+    )
+    if args.base and args.diff:
+        sys.stderr.write("error: --base and --diff cannot be combined\n")
+        return 2
+
+    changed_files = None
+    if args.base or args.diff:
+        try:
+            if args.base:
+                diff = git_diff(args.base)
+            elif args.diff == "-":
+                diff = sys.stdin.read()
+            else:
+                with open(args.diff, encoding="utf-8", errors="replace") as diff_file:
+                    diff = diff_file.read()
+        except (OSError, RuntimeError) as e:
+            sys.stderr.write(f"error: {e}\n")
+            return 2
+        changed_files = collect_changed_files(
+            parse_unified_diff(diff), args.paths, extensions, not args.include_vendored
+        )
+        files = list(changed_files)
+    else:
+        files = collect_files(args.paths, extensions, not args.no_gitignore, not args.include_vendored)
+
+    results = scan_files(
+        files, args.workers, args.max_vulnerabilities, args.time_budget, not args.include_vendored,
+        None if args.no_cache else args.cache_dir
+    )
+    if changed_files is not None:
+        results = [
+            filter_findings(result, changed_files[result["path"]], args.context)
+            if "vulnerabilities" in result else result
+            for result in results
+        ]
+    report = build_report(results)
+    output = FORMATTERS[args.format](report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            output_file.write(output)
+    else:
+        sys.stdout.write(output)
+
+    if report["files_failed"]:
+        return 2
+    return 1 if report["vulnerabilities_found"] and not args.exit_zero else 0
+
+if __name__ == "__main__":
+    sys.exit(main())